@@ -3,9 +3,17 @@ import MT5Manager
 import time
 import json
 import threading
+import functools
+import inspect
+import concurrent.futures
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
+from circuit_breaker import CircuitBreaker
+from manager_pool import ManagerPool, _disconnect
+from login_ranges import BAND_MARGIN, LoginRangeMap
 
-__all__ = ['MT5Service']
+__all__ = ['MT5Service', 'MT5Unavailable', 'MT5Busy', 'MT5Timeout', 'deadline_in']
 
 
 def _read_env(dotenv_path=None):
@@ -24,23 +32,354 @@ def _read_env(dotenv_path=None):
     return env
 
 
+# Occupied login bands learned per server (see login_ranges)
+LOGIN_RANGES_FILE = os.path.join(os.path.dirname(__file__), 'cache', 'login_ranges.json')
+
+# Accounts per batch yielded by the iter_accounts_* generators
+ACCOUNT_BATCH_SIZE = 1000
+
+# Manager API (subscribe, unsubscribe) method names per notification kind
+_SUBSCRIBE_METHODS = {
+    'position': ('PositionSubscribe', 'PositionUnsubscribe'),
+    'user': ('UserSubscribe', 'UserUnsubscribe'),
+    'account': ('UserAccountSubscribe', 'UserAccountUnsubscribe'),
+}
+
+
+def _position_to_dict(p):
+    """Convert an MT5 position object into the dict shape used across the RMS."""
+    return {
+        'login': getattr(p, 'Login', None),
+        'date': getattr(p, 'TimeCreate', None),
+        'id': getattr(p, 'Position', None),
+        'symbol': getattr(p, 'Symbol', None),
+        'volume': round(getattr(p, 'Volume', 0) / 10000, 2),
+        'price': getattr(p, 'PriceOpen', None),
+        'profit': getattr(p, 'Profit', None),
+        'type': 'Buy' if getattr(p, 'Action', None) == 0 else 'Sell',
+    }
+
+
+def _user_fields(user):
+    """Extract the account-table fields held on an MT5 user object."""
+    return {
+        'login': getattr(user, 'Login', None),
+        'name': getattr(user, 'Name', None) or f"{getattr(user, 'FirstName', '')} {getattr(user, 'LastName', '')}".strip(),
+        'email': getattr(user, 'EMail', None),
+        'group': getattr(user, 'Group', None),
+        'leverage': getattr(user, 'Leverage', None),
+    }
+
+
+def _account_state(account):
+    """Extract the fields used for change detection from an MT5 account object."""
+    return {
+        'balance': float(getattr(account, 'Balance', 0.0) or 0.0),
+        'equity': float(getattr(account, 'Equity', 0.0) or 0.0),
+        'margin': float(getattr(account, 'Margin', 0.0) or 0.0),
+        'profit': float(getattr(account, 'Profit', 0.0) or 0.0),
+    }
+
+
+def _account_row(user, account):
+    """Account-table row for an MT5 user and its account object or state dict
+    (zero balances when `account` is missing).
+    """
+    if isinstance(account, dict):
+        state = account
+    else:
+        state = _account_state(account) if account else {}
+    return {
+        **_user_fields(user),
+        'balance': state.get('balance', 0.0),
+        'equity': state.get('equity', 0.0),
+        'profit': state.get('profit', 0.0),
+    }
+
+
+def _batched(items, size):
+    """Yield lists of up to `size` items from the iterable `items`."""
+    size = max(1, int(size))
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _collect(batches, output_file=None):
+    """Concatenate account batches into one list, optionally also streaming
+    them to `output_file` as JSON lines.
+    """
+    accounts = []
+    write_file = open(output_file, 'w', encoding='utf-8') if output_file else None
+    try:
+        for batch in batches:
+            accounts.extend(batch)
+            if write_file:
+                for account_data in batch:
+                    write_file.write(json.dumps(account_data, default=str) + '\n')
+    finally:
+        if write_file:
+            write_file.close()
+    return accounts
+
+
+# Seconds a connection is trusted before the next heartbeat request
+HEARTBEAT_INTERVAL = 15
+# Seconds a caller waits for another thread's (re)connect before failing fast
+CONNECT_WAIT = 2.0
+# Seconds a read waits for a free pool connection before failing fast
+POOL_WAIT = 10.0
+# Attempts an enumeration read makes when no pool connection is free
+BUSY_ATTEMPTS = 3
+# Pump data pool connections need for their reads (users, groups, positions);
+# only the primary connection pumps everything for the live book
+POOL_PUMP_MODES = ('PUMP_MODE_USERS', 'PUMP_MODE_GROUPS', 'PUMP_MODE_POSITIONS')
+# Read results remembered per (method, arguments) to serve while MT5 is down
+LAST_GOOD_ENTRIES = 4096
+# Threads running calls made with a deadline
+CALL_WORKERS = 16
+# Seconds a coalesced read result is reused (see _coalesced)
+RESULT_TTL = 2.0
+ACCOUNTS_LIST_TTL = 5.0
+GROUPS_TTL = 30.0
+# Finished flights kept before expired ones are pruned
+FLIGHTS_PRUNE_AT = 1024
+
+_MISSING = object()
+
+
+class MT5Unavailable(Exception):
+    """MT5 Manager cannot be reached right now (circuit open or reconnect failed)."""
+
+
+class MT5Busy(MT5Unavailable):
+    """Every pool connection stayed checked out for POOL_WAIT seconds."""
+
+
+class MT5Timeout(TimeoutError):
+    """An MT5Service call did not finish before its deadline."""
+
+
+def deadline_in(seconds):
+    """Deadline `seconds` from now, for the `deadline` argument of read methods."""
+    return time.monotonic() + seconds
+
+
+def _set(mgr, **attrs):
+    # ManagerAPI objects may reject attributes; the markers are best effort
+    for name, value in attrs.items():
+        try:
+            setattr(mgr, name, value)
+        except Exception:
+            pass
+
+
+# ids of connections with a heartbeat request in flight
+_probes = set()
+_probes_lock = threading.Lock()
+
+
+def _probe(mgr):
+    try:
+        ping = getattr(mgr, 'TimeServer', None)
+        alive = ping is None or bool(ping())
+    except Exception:
+        alive = False
+    if alive:
+        _set(mgr, heartbeat_at=time.monotonic())
+    else:
+        _set(mgr, connected=False)
+    with _probes_lock:
+        _probes.discard(id(mgr))
+
+
+def _heartbeat(mgr):
+    """True when `mgr` is marked connected. At most every HEARTBEAT_INTERVAL
+    seconds a cheap TimeServer request is sent from a background thread, so
+    callers never wait on it; a connection that does not answer is marked
+    disconnected and fails the next check.
+    """
+    if mgr is None or not getattr(mgr, 'connected', False):
+        return False
+    if time.monotonic() - getattr(mgr, 'heartbeat_at', 0.0) >= HEARTBEAT_INTERVAL:
+        with _probes_lock:
+            start = id(mgr) not in _probes
+            _probes.add(id(mgr))
+        if start:
+            threading.Thread(target=_probe, args=(mgr,), name='mt5-heartbeat', daemon=True).start()
+    return True
+
+
+def _passes(signature, args, kwargs, names):
+    """True when a call with `args`/`kwargs` passes a value other than None
+    for any of the parameters `names`.
+    """
+    arguments = signature.bind_partial(*args, **kwargs).arguments
+    return any(arguments.get(name) is not None for name in names)
+
+
+def _last_good(method):
+    """Remember the method's last result per arguments and return it when the
+    call raises MT5Unavailable; without a remembered result the error propagates.
+    Calls writing an `output_file` are never answered from memory.
+    """
+    signature = inspect.signature(method)
+    writes_file = 'output_file' in signature.parameters
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (self.address, method.__name__, args,
+               tuple(sorted((name, value) for name, value in kwargs.items() if name != 'deadline')))
+        try:
+            hash(key)
+        except TypeError:
+            key = None
+        if writes_file and _passes(signature, (self,) + args,
+                                   {name: value for name, value in kwargs.items() if name != 'deadline'}, ('output_file',)):
+            key = None
+        try:
+            result = method(self, *args, **kwargs)
+        except MT5Unavailable:
+            with MT5Service._last_results_lock:
+                cached = MT5Service._last_results.get(key, _MISSING) if key is not None else _MISSING
+            if cached is _MISSING:
+                raise
+            return cached
+        if key is not None and result is not None:
+            with MT5Service._last_results_lock:
+                MT5Service._last_results[key] = result
+                MT5Service._last_results.move_to_end(key)
+                while len(MT5Service._last_results) > LAST_GOOD_ENTRIES:
+                    MT5Service._last_results.popitem(last=False)
+        return result
+    return wrapper
+
+
+def _bounded(method):
+    """Give the method a `deadline` keyword (a time.monotonic() value, see
+    `deadline_in`). With a deadline the call runs on the shared call executor
+    and MT5Timeout is raised once the deadline passes. A call still queued is
+    cancelled; one already inside the Manager API finishes in the background
+    and its result is dropped.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, deadline=None, **kwargs):
+        if deadline is None:
+            return method(self, *args, **kwargs)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise MT5Timeout(f"{method.__name__}: deadline already passed")
+        future = MT5Service.call_executor().submit(method, self, *args, **kwargs)
+        try:
+            return future.result(timeout=remaining)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise MT5Timeout(f"{method.__name__} did not finish within {remaining:.1f}s") from None
+    return wrapper
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error', 'expires')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.expires = 0.0
+
+
+def _coalesced(ttl, bypass=()):
+    """Single-flight: concurrent identical calls (same server, method and
+    arguments) share one in-flight call and its result, which is then reused
+    for `ttl` seconds. Errors reach every waiting caller but are not reused.
+    Results are shared between callers: treat them as read-only. Calls that
+    pass any of the `bypass` arguments (side effects such as writing a file)
+    always run on their own.
+    """
+    def decorate(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if bypass and _passes(signature, (self,) + args, kwargs, bypass):
+                return method(self, *args, **kwargs)
+            key = (self.address, method.__name__, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return method(self, *args, **kwargs)
+            now = time.monotonic()
+            with MT5Service._flights_lock:
+                flight = MT5Service._flights.get(key)
+                leader = flight is None or (flight.done.is_set() and (flight.error is not None or now >= flight.expires))
+                if leader:
+                    if len(MT5Service._flights) >= FLIGHTS_PRUNE_AT:
+                        for stale in [k for k, f in MT5Service._flights.items() if f.done.is_set() and now >= f.expires]:
+                            del MT5Service._flights[stale]
+                    flight = MT5Service._flights[key] = _Flight()
+            if not leader:
+                flight.done.wait()
+                if flight.error is not None:
+                    raise flight.error
+                return flight.result
+            try:
+                flight.result = method(self, *args, **kwargs)
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                flight.expires = time.monotonic() + ttl
+                flight.done.set()
+            return flight.result
+        return wrapper
+    return decorate
+
+
 class MT5Service:
     """Standalone, lightweight wrapper around MT5Manager for read-only operations.
 
     This avoids depending on Django models and provides simple helpers used by the
     RMS for listing accounts, reading account details and positions, and fetching groups.
+    Read methods accept a `deadline` keyword (see `deadline_in`) and raise
+    MT5Timeout when it passes. Account, group and deal listings used by the
+    views are coalesced: identical concurrent calls share one request and its
+    result is reused for a few seconds. Position and account-state reads used
+    by the scanner always hit MT5.
     """
 
     _shared_manager = None
     _shared_lock = threading.Lock()
+    # Bumped each time a new primary connection is opened; pump sinks
+    # registered on an earlier generation no longer receive notifications.
+    _generation = 0
+    # address -> LoginRangeMap
+    _login_ranges = {}
+    # address -> ManagerPool
+    _pools = {}
+    # address -> CircuitBreaker guarding (re)connects
+    _breakers = {}
+    _connect_lock = threading.Lock()
+    _last_results = OrderedDict()
+    _last_results_lock = threading.Lock()
+    _call_executor = None
+    # (address, method, arguments) -> _Flight of coalesced reads
+    _flights = {}
+    _flights_lock = threading.Lock()
 
-    def __init__(self, host=None, port=None, login=None, password=None, pump_mode=1, timeout=120000):
+    def __init__(self, host=None, port=None, login=None, password=None, pump_mode=1, timeout=120000, pool_size=None):
         # load defaults from .env if not provided
         env = _read_env()
         host = host or env.get('MT5_HOST')
         port = port or env.get('MT5_PORT')
         login = login or env.get('MT5_MANAGER_USER')
         password = password or env.get('MT5_MANAGER_PASS')
+        # independent Manager connections used for parallel reads (1 disables the pool)
+        pool_size = pool_size or env.get('MT5_POOL_SIZE') or os.environ.get('MT5_POOL_SIZE') or 1
 
         if host is None or port is None or login is None or password is None:
             raise ValueError('MT5 connection parameters missing (host, port, login, password).')
@@ -53,28 +392,47 @@ class MT5Service:
         self.password = password
         self.pump_mode = pump_mode
         self.timeout = timeout
+        try:
+            self.pool_size = max(1, int(pool_size))
+        except (TypeError, ValueError):
+            self.pool_size = 1
         self.manager = None
         self._instance_dir = None
         self._lock = threading.Lock()
+        self.group_timings = {}
+        self.range_stats = {}
 
-    def _init_manager(self):
-        # create per-process instance directory for MT5 library
-        pid = str(os.getpid())
+    def _new_manager(self, name):
+        """Create a ManagerAPI with its own instance directory mt5_instances/<name>."""
         base = os.path.join(os.getcwd(), 'mt5_instances')
-        os.makedirs(base, exist_ok=True)
-        inst = os.path.join(base, pid)
+        inst = os.path.join(base, name)
         os.makedirs(inst, exist_ok=True)
-        self._instance_dir = inst
         MT5Manager.InitializeManagerAPIPath(module_path=inst, work_path=inst)
-        self.manager = MT5Manager.ManagerAPI()
+        return MT5Manager.ManagerAPI(), inst
 
-    def connect(self):
-        """Connect to MT5 Manager. Raises Exception on failure."""
-        with MT5Service._shared_lock:
-            if MT5Service._shared_manager and getattr(MT5Service._shared_manager, 'connected', False):
-                return MT5Service._shared_manager
-            self._init_manager()
-            MT5Service._shared_manager = self.manager
+    def _init_manager(self):
+        # create per-process instance directory for MT5 library
+        self.manager, self._instance_dir = self._new_manager(str(os.getpid()))
+        return self.manager
+
+    def _pool_pump(self):
+        """Pump mode mask for pool connections built from POOL_PUMP_MODES, or
+        the numeric pump_mode when the library does not expose the constants.
+        """
+        try:
+            pump_enum = getattr(MT5Manager.ManagerAPI, 'EnPumpModes', None)
+            mask = 0
+            for name in POOL_PUMP_MODES:
+                mask |= int(getattr(pump_enum, name, 0))
+            return mask or self.pump_mode
+        except Exception:
+            return self.pump_mode
+
+    def _connect_manager(self, mgr, pump=None):
+        """Connect `mgr` to the server with `pump` mode (full pump when None).
+        Raises Exception on failure.
+        """
+        if pump is None:
             # Choose pump mode: prefer library constant if available, else use provided numeric
             pump = self.pump_mode
             try:
@@ -86,23 +444,162 @@ class MT5Service:
                 # fallback to numeric pump_mode already set
                 pump = self.pump_mode
 
-            if not MT5Service._shared_manager.Connect(self.address, int(self.login), str(self.password), pump, int(self.timeout)):
-                # try one more time with numeric fallback 1
-                last = MT5Manager.LastError()
-                try:
-                    if pump != 1:
-                        if MT5Service._shared_manager.Connect(self.address, int(self.login), str(self.password), 1, int(self.timeout)):
-                            MT5Service._shared_manager.connected = True
-                            return MT5Service._shared_manager
-                except Exception:
-                    pass
-                raise Exception(f"Failed to connect to MT5 Manager: {last}")
-            # mark connected
+        if not mgr.Connect(self.address, int(self.login), str(self.password), pump, int(self.timeout)):
+            # try one more time with numeric fallback 1
+            last = MT5Manager.LastError()
             try:
-                MT5Service._shared_manager.connected = True
+                if pump != 1:
+                    if mgr.Connect(self.address, int(self.login), str(self.password), 1, int(self.timeout)):
+                        mgr.connected = True
+                        return mgr
             except Exception:
                 pass
-            return MT5Service._shared_manager
+            raise Exception(f"Failed to connect to MT5 Manager: {last}")
+        # mark connected
+        try:
+            mgr.connected = True
+        except Exception:
+            pass
+        return mgr
+
+    @classmethod
+    def call_executor(cls):
+        """Long-lived executor (CALL_WORKERS threads) for calls with a deadline."""
+        with cls._shared_lock:
+            if MT5Service._call_executor is None:
+                MT5Service._call_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=CALL_WORKERS, thread_name_prefix='mt5-call')
+            return MT5Service._call_executor
+
+    def breaker(self):
+        """CircuitBreaker for connects to this server (shared by all instances)."""
+        with MT5Service._shared_lock:
+            breaker = MT5Service._breakers.get(self.address)
+            if breaker is None:
+                breaker = MT5Service._breakers[self.address] = CircuitBreaker()
+            return breaker
+
+    def _open_connection(self, build, pump=None):
+        """Create a Manager with `build()` and connect it through the circuit
+        breaker; nothing is created while the breaker is open. Raises
+        MT5Unavailable while the breaker is open or when creating or
+        connecting fails.
+        """
+        breaker = self.breaker()
+        if not breaker.allow():
+            raise MT5Unavailable(f"MT5 Manager unavailable, next retry in {breaker.retry_in():.0f}s "
+                                 f"(last error: {breaker.last_error})")
+        try:
+            mgr = build()
+            self._connect_manager(mgr, pump)
+        except Exception as e:
+            breaker.record_failure(e)
+            raise MT5Unavailable(str(e)) from e
+        breaker.record_success()
+        _set(mgr, heartbeat_at=time.monotonic())
+        return mgr
+
+    def connect(self):
+        """Connect to MT5 Manager. Raises MT5Unavailable on failure.
+
+        Returns the process-wide primary connection, which also carries the
+        pump subscriptions. Reads should go through `session()`. A connection
+        that fails its heartbeat is disconnected and replaced (see
+        `connection_generation`); failed reconnects back off exponentially
+        and, until the next retry, callers fail fast without creating a new
+        Manager. Callers wait at most CONNECT_WAIT seconds
+        for a reconnect already running in another thread.
+        """
+        mgr = MT5Service._shared_manager
+        if _heartbeat(mgr):
+            return mgr
+        if not MT5Service._connect_lock.acquire(timeout=CONNECT_WAIT):
+            raise MT5Unavailable('MT5 Manager reconnect in progress')
+        try:
+            mgr = MT5Service._shared_manager
+            if _heartbeat(mgr):
+                return mgr
+            if mgr is not None:
+                # drop the dead connection (and its pump sinks) before opening another
+                _disconnect(mgr)
+                with MT5Service._shared_lock:
+                    MT5Service._shared_manager = None
+            mgr = self._open_connection(self._init_manager)
+            with MT5Service._shared_lock:
+                MT5Service._shared_manager = mgr
+                MT5Service._generation += 1
+            return mgr
+        finally:
+            MT5Service._connect_lock.release()
+
+    @staticmethod
+    def connection_generation():
+        """Number of primary connections opened so far in this process. It
+        changes on every reconnect, after which pump sinks must be re-subscribed.
+        """
+        return MT5Service._generation
+
+    def status(self):
+        """Connection status for display: {'connected', 'breaker', 'retry_in', 'last_error'}."""
+        breaker = self.breaker()
+        return {
+            'connected': bool(getattr(MT5Service._shared_manager, 'connected', False)),
+            'breaker': breaker.state,
+            'retry_in': breaker.retry_in(),
+            'last_error': breaker.last_error,
+        }
+
+    def pool(self):
+        """ManagerPool of `pool_size` extra read connections for this server,
+        connected with only the POOL_PUMP_MODES pumps, or None when pooling is
+        disabled (pool_size <= 1).
+        """
+        if self.pool_size <= 1:
+            return None
+        with MT5Service._shared_lock:
+            pool = MT5Service._pools.get(self.address)
+            if pool is None:
+                def factory(slot):
+                    return self._open_connection(lambda: self._new_manager(f"{os.getpid()}-{slot}")[0],
+                                                 self._pool_pump())
+                pool = MT5Service._pools[self.address] = ManagerPool(factory, self.pool_size, check=_heartbeat)
+            return pool
+
+    @contextmanager
+    def session(self):
+        """Yield a Manager connection for a read: one checked out of the pool,
+        or the primary connection when pooling is disabled. Raises
+        MT5Busy when no pool connection frees up within POOL_WAIT seconds.
+        """
+        pool = self.pool()
+        if pool is None:
+            yield self.connect()
+            return
+        try:
+            slot, mgr = pool.acquire(POOL_WAIT)
+        except TimeoutError as e:
+            raise MT5Busy(f"No MT5 Manager connection free within {POOL_WAIT:g}s") from e
+        healthy = True
+        try:
+            yield mgr
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            pool.release(slot, mgr, healthy)
+
+    def _read(self, func):
+        """Return `func(mgr)` run in a `session()`, retried up to BUSY_ATTEMPTS
+        times while every pool connection is busy, so a burst of concurrent
+        reads waits its turn instead of failing a whole enumeration.
+        """
+        for attempt in range(BUSY_ATTEMPTS):
+            try:
+                with self.session() as mgr:
+                    return func(mgr)
+            except MT5Busy:
+                if attempt == BUSY_ATTEMPTS - 1:
+                    raise
 
     def close(self):
         try:
@@ -112,198 +609,389 @@ class MT5Service:
         except Exception:
             pass
 
+    @_last_good
+    @_bounded
+    @_coalesced(GROUPS_TTL)
     def get_group_list(self):
         """Return list of group names from MT5."""
-        mgr = self.connect()
-        groups = []
-        try:
-            total = mgr.GroupTotal()
-        except Exception:
-            total = 0
-        if not total:
-            return groups
-        for i in range(total):
+        with self.session() as mgr:
+            groups = []
             try:
-                g = mgr.GroupNext(i)
-                if not g:
-                    continue
-                name = None
-                for attr in ('Group', 'Name', 'group', 'name', 'GroupName'):
-                    if hasattr(g, attr):
-                        name = getattr(g, attr)
-                        break
-                if name:
-                    groups.append(name)
+                total = mgr.GroupTotal()
             except Exception:
-                continue
-        return groups
+                total = 0
+            if not total:
+                return groups
+            for i in range(total):
+                try:
+                    g = mgr.GroupNext(i)
+                    if not g:
+                        continue
+                    name = None
+                    for attr in ('Group', 'Name', 'group', 'name', 'GroupName'):
+                        if hasattr(g, attr):
+                            name = getattr(g, attr)
+                            break
+                    if name:
+                        groups.append(name)
+                except Exception:
+                    continue
+            return groups
 
+    @_last_good
+    @_bounded
+    @_coalesced(RESULT_TTL)
     def get_account_details(self, login_id):
         """Return detailed account dict or None."""
-        mgr = self.connect()
-        try:
-            user = mgr.UserGet(int(login_id))
-            account = mgr.UserAccountGet(int(login_id))
-            if not user or not account:
+        with self.session() as mgr:
+            try:
+                user = mgr.UserGet(int(login_id))
+                account = mgr.UserAccountGet(int(login_id))
+                if not user or not account:
+                    return None
+                return {
+                    'login': getattr(user, 'Login', None),
+                    'name': f"{getattr(user, 'FirstName', '')} {getattr(user, 'LastName', '')}".strip(),
+                    'email': getattr(user, 'EMail', None),
+                    'balance': float(getattr(account, 'Balance', 0.0)),
+                    'equity': float(getattr(account, 'Equity', 0.0)),
+                    'margin': float(getattr(account, 'Margin', 0.0)),
+                    'margin_free': float(getattr(account, 'MarginFree', 0.0)),
+                    'margin_level': float(getattr(account, 'MarginLevel', 0.0)),
+                    'profit': float(getattr(account, 'Profit', 0.0)),
+                    'group': getattr(user, 'Group', None),
+                    'leverage': getattr(user, 'Leverage', None),
+                    'rights': getattr(user, 'Rights', None),
+                    'last_access': getattr(user, 'LastAccess', None),
+                    'registration': getattr(user, 'Registration', None),
+                }
+            except Exception:
                 return None
-            return {
-                'login': getattr(user, 'Login', None),
-                'name': f"{getattr(user, 'FirstName', '')} {getattr(user, 'LastName', '')}".strip(),
-                'email': getattr(user, 'EMail', None),
-                'balance': float(getattr(account, 'Balance', 0.0)),
-                'equity': float(getattr(account, 'Equity', 0.0)),
-                'margin': float(getattr(account, 'Margin', 0.0)),
-                'margin_free': float(getattr(account, 'MarginFree', 0.0)),
-                'margin_level': float(getattr(account, 'MarginLevel', 0.0)),
-                'profit': float(getattr(account, 'Profit', 0.0)),
-                'group': getattr(user, 'Group', None),
-                'leverage': getattr(user, 'Leverage', None),
-                'rights': getattr(user, 'Rights', None),
-                'last_access': getattr(user, 'LastAccess', None),
-                'registration': getattr(user, 'Registration', None),
-            }
-        except Exception:
-            return None
 
+    @_last_good
+    @_bounded
     def get_open_positions(self, login_id):
         """Return list of open positions for the given login id."""
-        mgr = self.connect()
-        try:
-            positions = mgr.PositionGet(int(login_id))
+        with self.session() as mgr:
+            try:
+                positions = mgr.PositionGet(int(login_id))
+                if not positions:
+                    return []
+                return [_position_to_dict(p) for p in positions]
+            except Exception:
+                return []
+
+    @_last_good
+    @_bounded
+    def get_open_positions_by_group(self, group):
+        """Return open positions for every login in `group` with one request.
+
+        Uses the Manager API group request (PositionGetByGroup) instead of one
+        PositionGet per login. Each dict carries a 'login' key. Returns None when
+        the bulk request is unavailable or fails so callers can fall back to
+        per-login requests.
+        """
+        with self.session() as mgr:
+            bulk = getattr(mgr, 'PositionGetByGroup', None)
+            if bulk is None:
+                return None
+            try:
+                positions = bulk(str(group))
+            except Exception:
+                return None
             if not positions:
                 return []
-            out = []
-            for p in positions:
-                out.append({
-                    'date': getattr(p, 'TimeCreate', None),
-                    'id': getattr(p, 'Position', None),
-                    'symbol': getattr(p, 'Symbol', None),
-                    'volume': round(getattr(p, 'Volume', 0) / 10000, 2),
-                    'price': getattr(p, 'PriceOpen', None),
-                    'profit': getattr(p, 'Profit', None),
-                    'type': 'Buy' if getattr(p, 'Action', None) == 0 else 'Sell',
-                })
-            return out
-        except Exception:
-            return []
+            return [_position_to_dict(p) for p in positions]
+
+    @_bounded
+    def get_all_open_positions(self, groups=None):
+        """Return open positions for all groups (one bulk request per group).
+
+        Returns a dict mapping group name to its list of position dicts (or None
+        for groups whose bulk request failed).
+        """
+        if groups is None:
+            groups = self.get_group_list()
+        return {group: self.get_open_positions_by_group(group) for group in groups}
 
+    @_last_good
+    @_bounded
     def get_position_by_ticket(self, ticket):
         """Return position details for a specific ticket (position ID)."""
-        mgr = self.connect()
-        try:
-            position = mgr.PositionGet(ticket=int(ticket))
-            if not position:
+        with self.session() as mgr:
+            try:
+                position = mgr.PositionGet(ticket=int(ticket))
+                if not position:
+                    return None
+                # PositionGet with ticket returns a single position or list, handle accordingly
+                if isinstance(position, list):
+                    position = position[0] if position else None
+                if not position:
+                    return None
+                return _position_to_dict(position)
+            except Exception:
+                return None
+
+    def _account_states(self, mgr, group, users=None):
+        """{login (str): account state} for `group`: one UserAccountGetByGroup
+        request when the Manager API provides it, otherwise one UserAccountGet
+        per user of `users` (fetched with UserGetByGroup when not given).
+        """
+        bulk = getattr(mgr, 'UserAccountGetByGroup', None)
+        if bulk is not None:
+            accounts = bulk(str(group)) or []
+            return {str(getattr(a, 'Login', None)): _account_state(a) for a in accounts}
+        if users is None:
+            users = mgr.UserGetByGroup(str(group)) or []
+        states = {}
+        for u in users:
+            login = getattr(u, 'Login', None)
+            acc = mgr.UserAccountGet(login)
+            if acc:
+                states[str(login)] = _account_state(acc)
+        return states
+
+    @_last_good
+    @_bounded
+    def get_account_states_by_group(self, group):
+        """Return {login: {'balance', 'equity', 'margin', 'profit'}} for every
+        account in `group` (login keys are strings).
+
+        Uses the bulk UserAccountGetByGroup request when available, otherwise
+        UserGetByGroup plus one UserAccountGet per user. Returns None on failure.
+        """
+        with self.session() as mgr:
+            try:
+                return self._account_states(mgr, group)
+            except Exception:
                 return None
-            # PositionGet with ticket returns a single position or list, handle accordingly
-            if isinstance(position, list):
-                position = position[0] if position else None
-            if not position:
+
+    @_last_good
+    @_bounded
+    def list_users_by_group(self, group):
+        """Return the user fields (login, name, email, group, leverage) of every
+        user in `group` with one UserGetByGroup request, without per-user account
+        requests. Returns None on failure.
+        """
+        with self.session() as mgr:
+            try:
+                users = mgr.UserGetByGroup(str(group)) or []
+            except Exception:
                 return None
-            return {
-                'date': getattr(position, 'TimeCreate', None),
-                'id': getattr(position, 'Position', None),
-                'symbol': getattr(position, 'Symbol', None),
-                'volume': round(getattr(position, 'Volume', 0) / 10000, 2),
-                'price': getattr(position, 'PriceOpen', None),
-                'profit': getattr(position, 'Profit', None),
-                'type': 'Buy' if getattr(position, 'Action', None) == 0 else 'Sell',
-            }
+            return [_user_fields(u) for u in users]
+
+    def subscribe(self, kind, sink):
+        """Register a pump sink for 'position', 'user' or 'account' notifications.
+
+        The sink receives callbacks such as OnPositionAdd/OnPositionUpdate/
+        OnPositionDelete from the Manager API pump thread. Returns True when the
+        subscription was accepted.
+        """
+        mgr = self.connect()
+        method = getattr(mgr, _SUBSCRIBE_METHODS[kind][0], None)
+        if method is None:
+            return False
+        try:
+            return bool(method(sink))
         except Exception:
-            return None
+            return False
 
-    def list_accounts_by_index(self):
-        """Iterate accounts using UserTotal/UserGet (index based). Returns list of dicts."""
+    def unsubscribe(self, kind, sink):
+        """Remove a pump sink registered with `subscribe`."""
         mgr = self.connect()
-        accounts = []
+        method = getattr(mgr, _SUBSCRIBE_METHODS[kind][1], None)
+        if method is None:
+            return False
         try:
-            total = mgr.UserTotal()
+            return bool(method(sink))
         except Exception:
-            return accounts
-        for i in range(total):
+            return False
+
+    def iter_accounts_by_index(self, batch_size=ACCOUNT_BATCH_SIZE):
+        """Yield lists of up to `batch_size` account dicts, iterating accounts
+        with UserTotal/UserGet (index based).
+        """
+        with self.session() as mgr:
             try:
-                user = mgr.UserGet(i)
-                if not user:
-                    continue
-                acc = mgr.UserAccountGet(getattr(user, 'Login', None))
-                account_data = {
-                    'login': getattr(user, 'Login', None),
-                    'name': getattr(user, 'Name', None) or f"{getattr(user, 'FirstName', '')} {getattr(user, 'LastName', '')}".strip(),
-                    'email': getattr(user, 'EMail', None),
-                    'group': getattr(user, 'Group', None),
-                    'leverage': getattr(user, 'Leverage', None),
-                    'balance': float(getattr(acc, 'Balance', 0.0)) if acc else 0.0,
-                    'equity': float(getattr(acc, 'Equity', 0.0)) if acc else 0.0,
-                    'profit': float(getattr(acc, 'Profit', 0.0)) if acc else 0.0,
-                }
-                accounts.append(account_data)
+                total = mgr.UserTotal()
             except Exception:
-                continue
-        return accounts
+                return
 
-    def list_accounts_by_range(self, start, end, workers=8, batch_size=100, output_file=None):
-        """Scan numeric login IDs from start..end (inclusive) and return found accounts.
+            def accounts():
+                for i in range(total):
+                    try:
+                        user = mgr.UserGet(i)
+                        if not user:
+                            continue
+                        yield _account_row(user, mgr.UserAccountGet(getattr(user, 'Login', None)))
+                    except Exception:
+                        continue
 
-        This is a reliable fallback when index-based enumeration returns few results.
+            yield from _batched(accounts(), batch_size)
+
+    @_last_good
+    @_bounded
+    @_coalesced(ACCOUNTS_LIST_TTL)
+    def list_accounts_by_index(self):
+        """Iterate accounts using UserTotal/UserGet (index based). Returns list of dicts."""
+        return _collect(self.iter_accounts_by_index())
+
+    def login_ranges(self):
+        """LoginRangeMap learned for this server (shared by all instances)."""
+        with MT5Service._shared_lock:
+            ranges = MT5Service._login_ranges.get(self.address)
+            if ranges is None:
+                ranges = MT5Service._login_ranges[self.address] = LoginRangeMap(LOGIN_RANGES_FILE, self.address)
+            return ranges
+
+    def iter_accounts_by_range(self, start, end, workers=8, batch_size=100, learned=True):
+        """Scan numeric login IDs from start..end (inclusive) and yield the found
+        accounts, one list per non-empty chunk of up to `batch_size` logins (in
+        completion order).
+
+        With `learned` and a login range map for this server only its occupied
+        bands (plus a margin) are probed, together with a sparse sweep of the
+        rest when one is due; logins around a sweep hit are probed in the same
+        scan. Without a map every login is probed. A completed scan updates the
+        map. `workers` is capped at `pool_size`; at most 2 * `workers` chunks
+        are in flight and none are submitted while the consumer holds a batch. Progress is kept in `self.range_stats`
+        (probed, found, skipped, seconds, rate in logins per second).
         """
-        mgr = self.connect()
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
         start = int(start)
         end = int(end)
         if end < start:
             start, end = end, start
+        batch_size = max(1, int(batch_size))
+        workers = max(1, min(int(workers), self.pool_size))
+        ranges = self.login_ranges() if learned else None
+        full = not ranges
+        sweep = not full and ranges.sweep_due()
+        stats = self.range_stats = {'probed': 0, 'found': 0, 'skipped': 0, 'seconds': 0.0, 'rate': 0.0}
+        started = time.time()
 
-        def check_login(login_id):
-            try:
-                user = mgr.UserGet(int(login_id))
-                if not user:
-                    return None
-                acc = mgr.UserAccountGet(int(login_id))
-                return {
-                    'login': getattr(user, 'Login', None),
-                    'name': getattr(user, 'Name', None) or f"{getattr(user, 'FirstName', '')} {getattr(user, 'LastName', '')}".strip(),
-                    'email': getattr(user, 'EMail', None),
-                    'group': getattr(user, 'Group', None),
-                    'leverage': getattr(user, 'Leverage', None),
-                    'balance': float(getattr(acc, 'Balance', 0.0)) if acc else 0.0,
-                    'equity': float(getattr(acc, 'Equity', 0.0)) if acc else 0.0,
-                }
-            except Exception:
-                return None
+        def probe(mgr, logins):
+            found, errors = [], 0
+            for login_id in logins:
+                try:
+                    user = mgr.UserGet(login_id)
+                    if user:
+                        found.append(_account_row(user, mgr.UserAccountGet(login_id)))
+                except Exception:
+                    errors += 1
+            return found, errors
 
-        accounts = []
-        # optional streaming to file to avoid memory growth
-        write_file = None
-        if output_file:
-            write_file = open(output_file, 'w', encoding='utf-8')
+        def scan_chunk(logins):
+            return (logins, *self._read(lambda mgr: probe(mgr, logins)))
+
+        def split(first, last):
+            for low in range(first, last + 1, batch_size):
+                yield range(low, min(low + batch_size - 1, last) + 1)
 
+        def chunks():
+            for first, last in ([[start, end]] if full else ranges.probe_ranges(start, end)):
+                yield from split(first, last)
+            if sweep:
+                points = ranges.sweep_points(start, end)
+                for i in range(0, len(points), batch_size):
+                    yield points[i:i + batch_size]
+
+        pending = chunks()
+        neighbours = []
+        expanded = []
+        seen = set()
+        errors = 0
+        in_flight = set()
+        ex = ThreadPoolExecutor(max_workers=workers)
         try:
-            with ThreadPoolExecutor(max_workers=int(workers)) as ex:
-                futures = {ex.submit(check_login, lid): lid for lid in range(start, end + 1)}
-                for fut in as_completed(futures):
-                    res = fut.result()
-                    if res:
-                        accounts.append(res)
-                        if write_file:
-                            write_file.write(json.dumps(res, default=str) + '\n')
+            while True:
+                while len(in_flight) < 2 * workers:
+                    logins = neighbours.pop() if neighbours else next(pending, None)
+                    if logins is None:
+                        break
+                    in_flight.add(ex.submit(scan_chunk, logins))
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    logins, found, chunk_errors = fut.result()
+                    errors += chunk_errors
+                    stats['probed'] += len(logins)
+                    if isinstance(logins, list):
+                        # sweep hit: probe the band it belongs to
+                        for hit in found:
+                            login = int(hit['login'])
+                            if not any(first <= login <= last for first, last in expanded):
+                                first, last = max(start, login - BAND_MARGIN), min(end, login + BAND_MARGIN)
+                                expanded.append((first, last))
+                                neighbours.extend(split(first, last))
+                    found = [account for account in found if account['login'] not in seen]
+                    seen.update(account['login'] for account in found)
+                    stats['found'] += len(found)
+                    stats['seconds'] = time.time() - started
+                    stats['rate'] = stats['probed'] / stats['seconds'] if stats['seconds'] else 0.0
+                    if found:
+                        yield found
         finally:
-            if write_file:
-                write_file.close()
+            # an abandoned generator must not keep scanning
+            ex.shutdown(wait=True, cancel_futures=True)
 
-        return accounts
+        stats['skipped'] = max(0, end - start + 1 - stats['probed'])
+        if learned:
+            # only an error-free full scan may drop bands that emptied
+            ranges.record(seen, complete=full and not errors, swept=full or sweep)
+            ranges.save()
 
-    def list_accounts_by_groups(self, output_file=None):
-        """Enumerate users by group using UserGetByGroup. Returns list of account dicts.
+    @_last_good
+    @_bounded
+    @_coalesced(ACCOUNTS_LIST_TTL, bypass=('output_file',))
+    def list_accounts_by_range(self, start, end, workers=8, batch_size=100, output_file=None, learned=True):
+        """Scan numeric login IDs from start..end (inclusive) and return found accounts.
 
-        This method is useful when index-based enumeration doesn't return all users.
+        This is a reliable fallback when index-based enumeration returns few results.
+        See `iter_accounts_by_range`; `learned=False` probes every login.
         """
-        mgr = self.connect()
-        accounts = []
-        write_file = None
-        if output_file:
-            write_file = open(output_file, 'w', encoding='utf-8')
+        return _collect(self.iter_accounts_by_range(start, end, workers, batch_size, learned), output_file)
 
+    def _group_accounts(self, mgr, group_name):
+        """Account dicts of one group: UserGetByGroup joined with the group's
+        account states by login.
+        """
         try:
+            users = mgr.UserGetByGroup(group_name)
+        except Exception:
+            users = []
+        if not users:
+            return []
+        # account states for the whole group in one request, joined by login
+        try:
+            states = self._account_states(mgr, group_name, users)
+        except Exception:
+            states = {}
+        accounts = []
+        for u in users:
+            try:
+                accounts.append(_account_row(u, states.get(str(getattr(u, 'Login', None)))))
+            except Exception:
+                continue
+        return accounts
+
+    def iter_accounts_by_groups(self, workers=1, batch_size=ACCOUNT_BATCH_SIZE):
+        """Enumerate users by group and yield lists of up to `batch_size`
+        account dicts, in MT5 group order.
+
+        Account balances are fetched per group (UserAccountGetByGroup) and joined
+        to the users in memory, so a full refresh costs a few requests per group.
+        With `workers` > 1 (capped at `pool_size`) groups are fetched
+        concurrently, so the refresh takes about as long as the largest group. Per-group (accounts, seconds) are
+        recorded in `self.group_timings` as groups finish. The found logins
+        extend this server's login range map.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        group_names = []
+        with self.session() as mgr:
             try:
                 total = mgr.GroupTotal()
             except Exception:
@@ -311,69 +999,84 @@ class MT5Service:
             for i in range(total):
                 try:
                     g = mgr.GroupNext(i)
-                    if not g:
-                        continue
-                    group_name = getattr(g, 'Group', None)
-                    if not group_name:
-                        continue
-                    # UserGetByGroup may return iterable of user objects
-                    try:
-                        users = mgr.UserGetByGroup(group_name)
-                    except Exception:
-                        users = []
-                    if not users:
-                        continue
-                    for u in users:
-                        try:
-                            login = getattr(u, 'Login', None)
-                            acc = mgr.UserAccountGet(login)
-                            account_data = {
-                                'login': login,
-                                'name': getattr(u, 'Name', None) or f"{getattr(u, 'FirstName', '')} {getattr(u, 'LastName', '')}".strip(),
-                                'email': getattr(u, 'EMail', None),
-                                'group': getattr(u, 'Group', None),
-                                'leverage': getattr(u, 'Leverage', None),
-                                'balance': float(getattr(acc, 'Balance', 0.0)) if acc else 0.0,
-                                'equity': float(getattr(acc, 'Equity', 0.0)) if acc else 0.0,
-                                'profit': float(getattr(acc, 'Profit', 0.0)) if acc else 0.0,
-                            }
-                            accounts.append(account_data)
-                            if write_file:
-                                write_file.write(json.dumps(account_data, default=str) + '\n')
-                        except Exception:
-                            continue
+                    group_name = getattr(g, 'Group', None) if g else None
+                    if group_name:
+                        group_names.append(group_name)
                 except Exception:
                     continue
+
+        timings = self.group_timings = {}
+
+        def fetch_group(group_name):
+            started = time.time()
+            try:
+                result = self._read(lambda mgr: self._group_accounts(mgr, group_name))
+            except MT5Unavailable:
+                raise
+            except Exception:
+                result = []
+            timings[group_name] = (len(result), time.time() - started)
+            return result
+
+        workers = min(int(workers), self.pool_size)
+        executor = None
+        if workers > 1 and len(group_names) > 1:
+            executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            # results arrive in group order while later groups are still being fetched
+            results = executor.map(fetch_group, group_names) if executor else map(fetch_group, group_names)
+            logins = []
+            for batch in _batched((account for group_accounts in results for account in group_accounts), batch_size):
+                logins.extend(account['login'] for account in batch)
+                yield batch
         finally:
-            if write_file:
-                write_file.close()
+            if executor:
+                executor.shutdown(wait=True, cancel_futures=True)
+        # teach range scans where logins live
+        if logins:
+            ranges = self.login_ranges()
+            ranges.record(logins)
+            ranges.save()
 
-        return accounts
+    @_last_good
+    @_bounded
+    @_coalesced(ACCOUNTS_LIST_TTL, bypass=('output_file',))
+    def list_accounts_by_groups(self, output_file=None, workers=1):
+        """Enumerate users by group using UserGetByGroup. Returns list of account dicts.
 
+        See `iter_accounts_by_groups`. This method is useful when index-based
+        enumeration doesn't return all users.
+        """
+        return _collect(self.iter_accounts_by_groups(workers), output_file)
+
+    @_last_good
+    @_bounded
+    @_coalesced(RESULT_TTL)
     def list_deals_by_login(self, login_id):
         """Return list of closed deals for the given login id."""
-        mgr = self.connect()
-        try:
-            deals = mgr.DealGet(int(login_id))
-            if not deals:
+        with self.session() as mgr:
+            try:
+                deals = mgr.DealGet(int(login_id))
+                if not deals:
+                    return []
+                out = []
+                for d in deals:
+                    out.append({
+                        'Deal': getattr(d, 'Deal', None),
+                        'Login': getattr(d, 'Login', None),
+                        'Symbol': getattr(d, 'Symbol', None),
+                        'Profit': getattr(d, 'Profit', None),
+                        'Volume': round(getattr(d, 'Volume', 0) / 10000, 2),
+                        'Price': getattr(d, 'Price', None),
+                        'Time': getattr(d, 'Time', None),
+                        'Type': getattr(d, 'Action', None),
+                        'Entry': getattr(d, 'Entry', None),
+                    })
+                return out
+            except Exception:
                 return []
-            out = []
-            for d in deals:
-                out.append({
-                    'Deal': getattr(d, 'Deal', None),
-                    'Login': getattr(d, 'Login', None),
-                    'Symbol': getattr(d, 'Symbol', None),
-                    'Profit': getattr(d, 'Profit', None),
-                    'Volume': round(getattr(d, 'Volume', 0) / 10000, 2),
-                    'Price': getattr(d, 'Price', None),
-                    'Time': getattr(d, 'Time', None),
-                    'Type': getattr(d, 'Action', None),
-                    'Entry': getattr(d, 'Entry', None),
-                })
-            return out
-        except Exception:
-            return []
 
+    @_bounded
     def search_accounts_by_name_email(self, name=None, email=None):
         """Search accounts by name or email. Returns list of matching accounts."""
         accounts = self.list_accounts_by_groups()
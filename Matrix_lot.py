@@ -1,5 +1,10 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
+from positions_snapshot import snapshot_for
+from aggregation_cache import cached_aggregation
+from exposure import get_exposure, get_totals
+from sparse_matrix import SparseMatrix, display_sparse_matrix
 # Delay importing MT5Service until needed to avoid import-time/circular issues
 import io
 import logging
@@ -12,10 +17,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-__all__ = ['get_login_symbol_matrix', 'get_detailed_position_table', 'display_position_table', 'display_login_symbol_pivot_table']
+__all__ = ['get_login_symbol_sparse', 'get_login_symbol_matrix', 'get_detailed_position_table', 'display_position_table', 'display_login_symbol_pivot_table']
 
-@st.cache_data(ttl=5)      # 🔥 Auto-cache for speed (reloads every 5 sec)
-def get_login_symbol_matrix(accounts_df=None, positions_cache=None):
+@cached_aggregation   # keyed on positions snapshot + accounts version
+def get_login_symbol_sparse(accounts_df=None, positions_cache=None):
+    """Login x symbol net lot matrix as a SparseMatrix (only non-empty cells)."""
     from MT5Service import MT5Service
     svc = MT5Service()
 
@@ -26,11 +32,10 @@ def get_login_symbol_matrix(accounts_df=None, positions_cache=None):
         # Fallback to fetching all accounts
         accounts = svc.list_deals_by_login()
         if not accounts:
-            return pd.DataFrame()
+            return SparseMatrix.from_dict({})
         logins = [acc["Login"] for acc in accounts]
 
     matrix = {}
-    all_symbols = set()
 
     # If positions_cache wasn't provided, try to read it from Streamlit session state
     if positions_cache is None:
@@ -39,107 +44,55 @@ def get_login_symbol_matrix(accounts_df=None, positions_cache=None):
         except Exception:
             positions_cache = None
 
-    # Normalize positions data if cache is available
-    positions_list = None
-    if positions_cache:
-        # positions_cache may contain {'data': [...], 'timestamp': ..., ...}
-        if isinstance(positions_cache, dict) and 'data' in positions_cache:
-            positions_list = positions_cache.get('data') or []
-        elif isinstance(positions_cache, list):
-            positions_list = positions_cache
+    # Use cached positions (background scanner): net lots from the shared exposure engine
+    snapshot = snapshot_for(positions_cache) if positions_cache is not None else None
+    if snapshot is not None and len(snapshot):
+        return SparseMatrix.from_exposure(get_exposure(snapshot), 'net_lot', logins, get_totals(snapshot))
 
     for login in logins:
         symbol_lots = {}
 
-        # First try to use cached positions (faster, background scanner)
-        if positions_list:
-            # positions stored by scanner include 'Login' key
-            for p in positions_list:
-                try:
-                    p_login = str(p.get('Login') or p.get('login') or '')
-                except Exception:
-                    p_login = ''
-                if p_login != str(login):
-                    continue
-
-                symbol = p.get('Symbol') or p.get('symbol')
-                volume = p.get('Vol') or p.get('volume')
-                order_type = p.get('Type') or p.get('type')
-
-                try:
-                    volume = float(volume)
-                except Exception:
-                    volume = 0.0
-
-                if not symbol:
-                    continue
-
-                if symbol not in symbol_lots:
-                    symbol_lots[symbol] = 0.0
-
-                # Determine if position is buy or sell
-                is_buy = False
-                if isinstance(order_type, (int, float)):
-                    is_buy = int(order_type) == 0
-                elif isinstance(order_type, str):
-                    is_buy = order_type.strip().lower().startswith('b')
-                else:
-                    is_buy = True
+        # Fallback: query MT5Service per-login, combine open positions and deals
+        open_positions = svc.get_open_positions(login) or []
+        deals = svc.list_deals_by_login(login) or []
+        positions = open_positions + deals
+        for p in positions:
+            symbol = p.get('symbol') or p.get('Symbol')
+            volume = p.get('volume') or p.get('Volume') or 0
+            order_type = p.get('type') or p.get('Type')
 
-                symbol_lots[symbol] += volume
-                all_symbols.add(symbol)
-
-        else:
-            # Fallback: query MT5Service per-login, combine open positions and deals
-            open_positions = svc.get_open_positions(login) or []
-            deals = svc.list_deals_by_login(login) or []
-            positions = open_positions + deals
-            for p in positions:
-                symbol = p.get('symbol') or p.get('Symbol')
-                volume = p.get('volume') or p.get('Volume') or 0
-                order_type = p.get('type') or p.get('Type')
-
-                try:
-                    volume = float(volume)
-                except Exception:
-                    volume = 0.0
-
-                if not symbol:
-                    continue
-
-                if symbol not in symbol_lots:
-                    symbol_lots[symbol] = 0.0
-
-                is_buy = False
-                if isinstance(order_type, (int, float)):
-                    is_buy = int(order_type) == 0
-                elif isinstance(order_type, str):
-                    is_buy = order_type.strip().lower().startswith('b')
-                else:
-                    is_buy = True
+            try:
+                volume = float(volume)
+            except Exception:
+                volume = 0.0
 
-                symbol_lots[symbol] += volume if is_buy else -volume
-                all_symbols.add(symbol)
+            if not symbol:
+                continue
 
-        matrix[login] = symbol_lots
+            if symbol not in symbol_lots:
+                symbol_lots[symbol] = 0.0
 
-    # Convert into DataFrame
-    df = pd.DataFrame.from_dict(matrix, orient="index").fillna(0.0)
+            is_buy = False
+            if isinstance(order_type, (int, float)):
+                is_buy = int(order_type) == 0
+            elif isinstance(order_type, str):
+                is_buy = order_type.strip().lower().startswith('b')
+            else:
+                is_buy = True
 
-    if not df.empty and len(df.columns) > 0:
-        # Add "All Login" Row
-        df.loc["All Login"] = df.sum()
+            symbol_lots[symbol] += volume if is_buy else -volume
 
-        # Sort columns alphabetically
-        df = df[sorted(df.columns)]
+        matrix[login] = symbol_lots
 
-        # Move All Login to top
-        df = df.reindex(["All Login"] + [i for i in df.index if i != "All Login"])
+    return SparseMatrix.from_dict(matrix)
 
-    return df
 
+def get_login_symbol_matrix(accounts_df=None, positions_cache=None):
+    """Dense login x symbol net lot DataFrame with the 'All Login' row on top."""
+    return get_login_symbol_sparse(accounts_df, positions_cache).to_frame()
 
-@st.cache_data(ttl=5)  # 🔥 Auto-cache for speed (reloads every 5 sec)
+
+@cached_aggregation   # keyed on positions snapshot + accounts version
 def get_detailed_position_table(accounts_df=None, positions_cache=None):
     """
     Get detailed position table in Symbol × Login format with volumes.
@@ -174,51 +127,21 @@ def get_detailed_position_table(accounts_df=None, positions_cache=None):
         except Exception:
             positions_cache = None
 
-    # Normalize positions data if cache is available
-    positions_list = None
-    if positions_cache:
-        if isinstance(positions_cache, dict) and 'data' in positions_cache:
-            positions_list = positions_cache.get('data') or []
-        elif isinstance(positions_cache, list):
-            positions_list = positions_cache
+    # Columnar snapshot of the positions maintained by the background scanner
+    snapshot = snapshot_for(positions_cache) if positions_cache else None
 
     all_records = []
-
-    if positions_list:
-        # Use cached positions
-        for p in positions_list:
-            try:
-                p_login = str(p.get('Login') or p.get('login') or '')
-                symbol = p.get('Symbol') or p.get('symbol')
-                volume = p.get('Vol') or p.get('volume') or 0
-                order_type = p.get('Type') or p.get('type')
-
-                if not symbol or not p_login:
-                    continue
-
-                try:
-                    volume = float(volume)
-                except Exception:
-                    volume = 0.0
-
-                # Determine if position is buy or sell
-                is_buy = True
-                if isinstance(order_type, (int, float)):
-                    is_buy = int(order_type) == 0
-                elif isinstance(order_type, str):
-                    is_buy = order_type.strip().lower().startswith('b')
-
-                # Net volume (positive for buy, negative for sell)
-                net_volume = volume if is_buy else -volume
-
-                all_records.append({
-                    'Symbol': symbol,
-                    'Login': p_login,
-                    'Volume': net_volume,
-                    'Type': order_type
-                })
-            except Exception:
-                continue
+    cached_df = None
+
+    if snapshot is not None and len(snapshot):
+        # Use cached positions: net volume (positive for buy, negative for sell)
+        cached_df = pd.DataFrame({
+            'Symbol': snapshot.symbol_column().astype(str),
+            'Login': snapshot.login.astype(str),
+            'Volume': snapshot.volume * snapshot.side,
+            'Type': np.where(snapshot.side > 0, 'Buy', 'Sell'),
+        })
+        cached_df = cached_df[cached_df['Symbol'] != '']
     else:
         # Fallback: query MT5Service per-login
         for login in logins:
@@ -254,11 +177,11 @@ def get_detailed_position_table(accounts_df=None, positions_cache=None):
             except Exception:
                 continue
 
-    if not all_records:
+    if not all_records and (cached_df is None or cached_df.empty):
         logger.warning("⚠️  No position records found")
         return pd.DataFrame(columns=['Symbol', 'Login', 'Volume', 'Type'])
 
-    df = pd.DataFrame(all_records)
+    df = cached_df if cached_df is not None else pd.DataFrame(all_records)
     # Handle duplicates: aggregate volumes for same Symbol and Login
     df = df.groupby(['Symbol', 'Login'], as_index=False).agg({
         'Volume': 'sum',
@@ -314,49 +237,43 @@ def display_login_symbol_pivot_table(accounts_df=None, positions_cache=None):
     st.write("**Rows: Login IDs | Columns: Symbols | Values: Net Lot Volume**")
     
     try:
-        # Get the matrix
-        matrix_df = get_login_symbol_matrix(accounts_df, positions_cache)
+        # Get the matrix (sparse: only non-empty login x symbol cells)
+        matrix = get_login_symbol_sparse(accounts_df, positions_cache)
         
-        if matrix_df.empty:
+        if matrix.empty:
             st.warning("No data available to display pivot table.")
             return
         
-        logger.info(f"Matrix shape: {matrix_df.shape}")
-        logger.info(f"Logins (rows): {len(matrix_df) - 1} (plus All Login row)")
-        logger.info(f"Symbols (columns): {len(matrix_df.columns)}")
+        logger.info(f"Matrix shape: {matrix.shape} ({matrix.nnz} non-empty cells)")
+        logger.info(f"Logins (rows): {len(matrix)} (plus All Login row)")
+        logger.info(f"Symbols (columns): {len(matrix.symbols)}")
         
         # Display metrics
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Logins", len(matrix_df) - 1)
+            st.metric("Total Logins", len(matrix))
         with col2:
-            st.metric("Total Symbols", len(matrix_df.columns))
+            st.metric("Total Symbols", len(matrix.symbols))
         with col3:
-            total_lots = matrix_df.loc['All Login'].sum() if 'All Login' in matrix_df.index else matrix_df.sum().sum()
+            total_lots = matrix.total()
             st.metric("Total Lots (All Login)", f"{total_lots:.2f}")
         
-        # Display the pivot table
+        # Display the pivot table, densifying only the visible page
         st.write("**Pivot Table (Login × Symbol):**")
-        
-        # Format the dataframe for display
-        display_df = matrix_df.copy()
-        display_df = display_df.round(2)
-        
-        # Show with index (Login names)
-        st.dataframe(display_df, width='stretch', height=500)
+        display_df = display_sparse_matrix(matrix, key='lot_pivot')
         
         # Log first 2 rows
         logger.info("")
         logger.info("FIRST 2 ROWS OF PIVOT TABLE:")
         logger.info("-" * 80)
-        for idx, row_name in enumerate(matrix_df.index[:2]):
-            row_data = matrix_df.loc[row_name]
+        for idx, row_name in enumerate(display_df.index[:2]):
+            row_data = display_df.loc[row_name]
             logger.info(f"Row {idx + 1} (Login={row_name}): {dict(row_data)}")
         logger.info("-" * 80)
         logger.info("")
         
         # Export option
-        csv = display_df.to_csv().encode('utf-8')
+        csv = matrix.to_csv().encode('utf-8')
         st.download_button(
             label='📥 Download Matrix as CSV',
             data=csv,
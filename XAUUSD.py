@@ -2,6 +2,7 @@ import pandas as pd
 import streamlit as st
 import time
 from MT5Service import MT5Service
+from positions_store import as_positions_store
 
 def get_xauusd_data():
     st.subheader('XAUUSD Positions')
@@ -10,9 +11,8 @@ def get_xauusd_data():
     if 'xauusd_filter' not in st.session_state:
         st.session_state.xauusd_filter = 'all'
 
-    # Get positions data from cache
-    positions_cache = st.session_state.get('positions_cache', {})
-    positions_list = positions_cache.get('data') or []
+    # Get positions store from cache
+    store = as_positions_store(st.session_state.get('positions_cache'))
 
     # Get accounts
     svc = MT5Service()
@@ -24,15 +24,19 @@ def get_xauusd_data():
         st.error(f"Error loading accounts: {e}")
         accounts = []
     accounts_df = pd.DataFrame(accounts)
+    # Index account rows by login for O(1) lookups per aggregated login
+    accounts_by_login = {}
+    if not accounts_df.empty and 'login' in accounts_df.columns:
+        accounts_by_login = {str(acc.get('login')): acc for acc in accounts_df.to_dict('records')}
 
     # Function to create and display the dataframe
     def update_table():
-        xauusd_positions = [p for p in positions_list if p.get('Symbol') == 'XAUUSD']
+        xauusd_positions = store.for_symbol('XAUUSD') if store else []
         if not xauusd_positions:
             # Show empty table with columns
             df = pd.DataFrame(columns=['Login', 'Name', 'Group', 'Base Symbol', 'Type', 'Net Lot', 'USD P&L'])
             table_placeholder.dataframe(df)
-            if not positions_list:
+            if not store:
                 st.info('No data available. Please wait for background scan.')
             else:
                 st.info('No XAUUSD data found.')
@@ -58,11 +62,11 @@ def get_xauusd_data():
         # Create dataframe
         data = []
         for login, vals in agg.items():
-            account = accounts_df[accounts_df['login'].astype(str) == login]
-            if not account.empty:
-                name = account['name'].iloc[0]
-                group = account['group'].iloc[0]
-                usd_pnl = account['profit'].iloc[0]
+            account = accounts_by_login.get(login)
+            if account is not None:
+                name = account.get('name')
+                group = account.get('group')
+                usd_pnl = account.get('profit')
             else:
                 name = 'Unknown'
                 group = 'Unknown'
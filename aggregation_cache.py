@@ -0,0 +1,89 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+import streamlit as st
+from backend import accounts_shared
+from positions_snapshot import snapshot_for
+
+__all__ = ['cached_aggregation', 'accounts_version', 'clear_aggregation_cache']
+
+# Entries kept across all aggregation functions and parameter combinations
+MAX_ENTRIES = 64
+# When no scan has been published the views fall back to live MT5 calls;
+# those results are only reused for this many seconds.
+UNVERSIONED_TTL = 5
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+
+
+def accounts_version(accounts_df):
+    """Return a cheap version for an accounts DataFrame.
+
+    The process-shared table published by the backend is keyed on its
+    `attrs['version']`. Frames derived from it (filtered, copied) inherit the
+    attrs but not necessarily the rows, so only the shared object itself is
+    trusted; for any other frame the login column, the only column the
+    aggregations read, is hashed together with its length.
+    """
+    if accounts_df is None or accounts_df.empty:
+        return None
+    if accounts_df is accounts_shared['df'] and accounts_df.attrs.get('version') is not None:
+        return accounts_df.attrs['version']
+    if 'login' not in accounts_df.columns:
+        return ('rows', len(accounts_df))
+    logins = accounts_df['login'].astype(str)
+    return ('logins', len(logins), int(pd.util.hash_pandas_object(logins, index=False).sum()))
+
+
+def clear_aggregation_cache():
+    with _lock:
+        _entries.clear()
+
+
+def cached_aggregation(func):
+    """Cache `func(accounts_df, positions_cache, *args)` on
+    (function, accounts version, positions snapshot version, args).
+
+    Replaces `st.cache_data` for the matrix views: instead of pickling and
+    hashing the accounts DataFrame and the positions cache on every call, the
+    key is built from the two versions, so a hit costs O(1). The wrapped
+    function receives the PositionsSnapshot as `positions_cache`, so the
+    result always matches the version it is cached under. Before the first
+    publish the snapshot is built from the store and keyed on the store
+    version, so views follow a running first scan. Cached results are
+    shared between sessions and must be treated as read-only.
+    """
+    @functools.wraps(func)
+    def wrapper(accounts_df=None, positions_cache=None, *args):
+        if positions_cache is None:
+            try:
+                positions_cache = st.session_state.get('positions_cache')
+            except Exception:
+                positions_cache = None
+        snapshot = snapshot_for(positions_cache) if positions_cache is not None else None
+        version = snapshot.cache_key if snapshot is not None and len(snapshot) > 0 else None
+        versioned = version is not None
+
+        key = (func.__qualname__, accounts_version(accounts_df), args)
+        now = time.time()
+        with _lock:
+            entry = _entries.get(key)
+            if entry is not None:
+                entry_version, created, result = entry
+                if entry_version == version and (versioned or now - created < UNVERSIONED_TTL):
+                    _entries.move_to_end(key)
+                    return result
+
+        result = func(accounts_df, snapshot if versioned else positions_cache, *args)
+        with _lock:
+            _entries[key] = (version, now, result)
+            _entries.move_to_end(key)
+            while len(_entries) > MAX_ENTRIES:
+                _entries.popitem(last=False)
+        return result
+
+    wrapper.clear = clear_aggregation_cache
+    return wrapper
@@ -0,0 +1,77 @@
+import asyncio
+import concurrent.futures
+import functools
+import threading
+import weakref
+from MT5Service import MT5Service, MT5Timeout
+
+__all__ = ['AsyncMT5Service']
+
+# Threads shared by every AsyncMT5Service for blocking Manager API calls
+ASYNC_WORKERS = 16
+
+
+class AsyncMT5Service:
+    """Asyncio facade over MT5Service.
+
+    Blocking reads run on one long-lived executor of ASYNC_WORKERS threads
+    shared by all instances, and at most `concurrency` calls per instance and
+    event loop are in flight; the rest wait on a semaphore. Callers can
+    `asyncio.gather` thousands of lookups without creating thread pools or
+    queueing unbounded work. With `timeout` (seconds) the wait ends with
+    MT5Timeout; a call that already entered the Manager API finishes in the
+    background.
+    """
+
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, service=None, concurrency=ASYNC_WORKERS, **kwargs):
+        self.service = service or MT5Service(**kwargs)
+        self.concurrency = max(1, int(concurrency))
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def executor(cls):
+        with cls._executor_lock:
+            if AsyncMT5Service._executor is None:
+                AsyncMT5Service._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=ASYNC_WORKERS, thread_name_prefix='mt5-async')
+            return AsyncMT5Service._executor
+
+    def _semaphore(self):
+        # asyncio primitives belong to one loop: keep a semaphore per running loop
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.concurrency)
+        return semaphore
+
+    async def _call(self, method, *args, timeout=None, **kwargs):
+        async with self._semaphore():
+            future = asyncio.get_running_loop().run_in_executor(self.executor(), functools.partial(method, *args, **kwargs))
+            if timeout is None:
+                return await future
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                raise MT5Timeout(f"{method.__name__} did not finish within {timeout}s") from None
+
+    async def get_open_positions(self, login_id, timeout=None):
+        """Return list of open positions for the given login id."""
+        return await self._call(self.service.get_open_positions, login_id, timeout=timeout)
+
+    async def get_account_details(self, login_id, timeout=None):
+        """Return detailed account dict or None."""
+        return await self._call(self.service.get_account_details, login_id, timeout=timeout)
+
+    async def list_accounts_by_groups(self, workers=1, timeout=None):
+        """Enumerate users by group. Returns list of account dicts."""
+        return await self._call(self.service.list_accounts_by_groups, workers=workers, timeout=timeout)
+
+    async def list_deals_by_login(self, login_id, timeout=None):
+        """Return list of closed deals for the given login id."""
+        return await self._call(self.service.list_deals_by_login, login_id, timeout=timeout)
+
+    def status(self):
+        return self.service.status()
@@ -3,13 +3,25 @@ import json
 import time
 import threading
 import concurrent.futures
-from MT5Service import MT5Service
+from MT5Service import MT5Service, MT5Timeout, deadline_in
+from circuit_breaker import CircuitBreaker
+from live_book import LiveBook
+from positions_store import PositionsStore
+from positions_snapshot import PositionsSnapshot, load_snapshot, save_snapshot
+from columnar_store import ColumnSink, columns_to_frame, frame_to_columns, read_columns, read_version, write_columns
+from exposure import RunningExposure, publish_exposure
 import pandas as pd
 import streamlit as st
 
 # Local cache files (used so Streamlit clients can read pre-fetched data)
 CACHE_DIR = os.path.join(os.path.dirname(__file__), 'cache')
+# Columnar accounts store (see columnar_store); accounts_cache.json is the
+# JSON file written by earlier versions and is only read when no store exists
+ACCOUNTS_STORE_DIR = os.path.join(CACHE_DIR, 'accounts')
 ACCOUNTS_CACHE_FILE = os.path.join(CACHE_DIR, 'accounts_cache.json')
+POSITIONS_SNAPSHOT_DIR = os.path.join(CACHE_DIR, 'positions_snapshot')
+# Seconds between persisting snapshots published from live updates
+POSITIONS_SAVE_INTERVAL = 30
 
 def _ensure_cache_dir():
     try:
@@ -18,42 +30,134 @@ def _ensure_cache_dir():
         pass
 
 def save_accounts_cache(df):
-    """Save accounts DataFrame to local cache file as JSON records."""
+    """Save accounts DataFrame to the columnar accounts store. Returns the
+    stored version, or None when the write failed.
+    """
     try:
         _ensure_cache_dir()
-        # use orient='records' so it's easy to load back with json_normalize
-        df.to_json(ACCOUNTS_CACHE_FILE, orient='records', force_ascii=False)
+        return write_columns(ACCOUNTS_STORE_DIR, frame_to_columns(df), kind='accounts')['version']
     except Exception as e:
         print(f"Error saving accounts cache: {e}")
+    return None
+
+# Process-shared accounts table, analogous to positions_cache_global. Sessions
+# get a reference to the same DataFrame; the accounts updater replaces it.
+accounts_shared = {'version': None, 'df': None}
+accounts_shared_lock = threading.Lock()
+
+def _publish_accounts(df, version):
+    """Swap `df` in as the shared accounts table (logins normalised to str)."""
+    if 'login' in df.columns and not pd.api.types.is_string_dtype(df['login']):
+        df = df.assign(login=df['login'].astype(str))
+    # cheap version used as cache key by aggregation_cache
+    df.attrs['version'] = f"accounts:{version}"
+    with accounts_shared_lock:
+        accounts_shared.update(version=version, df=df)
+    return df
 
-def load_accounts_cache():
-    """Load accounts cache from local JSON file. Returns DataFrame or empty DataFrame."""
+def get_shared_accounts():
+    """Return the process-shared accounts DataFrame (empty when none is stored).
+
+    All sessions receive the same object: treat it as read-only and derive
+    new frames (`assign`, `copy`, filtering) instead of mutating it. Only the
+    store's version sidecar is read while the version is unchanged; when it
+    moved (e.g. another process wrote the store) the columns are re-mapped.
+    If a reload fails the last good table is kept. Falls back to the legacy
+    JSON cache file when no store exists yet.
+    """
     try:
-        if os.path.exists(ACCOUNTS_CACHE_FILE):
-            return pd.read_json(ACCOUNTS_CACHE_FILE)
+        store_version = read_version(ACCOUNTS_STORE_DIR)
+        version = store_version
+        if version is None and os.path.exists(ACCOUNTS_CACHE_FILE):
+            stat = os.stat(ACCOUNTS_CACHE_FILE)
+            version = f"{stat.st_mtime_ns}:{stat.st_size}"
+        with accounts_shared_lock:
+            if version is None or accounts_shared['version'] == version:
+                df = accounts_shared['df']
+                return df if df is not None else pd.DataFrame()
+
+        if store_version is not None:
+            columns, manifest = read_columns(ACCOUNTS_STORE_DIR)
+            if columns is not None and manifest.get('kind') == 'accounts':
+                return _publish_accounts(columns_to_frame(columns), manifest['version'])
+        else:
+            return _publish_accounts(pd.read_json(ACCOUNTS_CACHE_FILE), version)
     except Exception as e:
         print(f"Error loading accounts cache: {e}")
-    return pd.DataFrame()
+    with accounts_shared_lock:
+        df = accounts_shared['df']
+    return df if df is not None else pd.DataFrame()
+
+def load_accounts_cache():
+    """Load the accounts table. Returns a shallow copy of the shared DataFrame
+    (see `get_shared_accounts`) or an empty DataFrame.
+    """
+    return get_shared_accounts().copy(deep=False)
 
 # Background updater for accounts cache
 accounts_updater_thread = None
 accounts_updater_stop_event = None
 
-def accounts_updater_runner(interval_seconds=300, use_groups=True, stop_event=None):
-    """Runner loop that periodically refreshes the accounts cache by calling
-    `load_from_mt5()` (clearing the cache to force fresh fetch). The function
-    will run until `stop_event` is set.
+# Every Nth updater pass is a full re-enumeration; the others are incremental
+# Groups fetched concurrently by a full accounts enumeration (capped at the MT5 pool size)
+# Groups fetched concurrently by a full accounts enumeration
+ACCOUNTS_GROUP_WORKERS = 8
+
+
+def _account_batches_by_groups(svc):
+    """Yield account batches by group with ACCOUNTS_GROUP_WORKERS and log the slowest groups."""
+    started = time.time()
+    count = 0
+    for batch in svc.iter_accounts_by_groups(workers=ACCOUNTS_GROUP_WORKERS):
+        count += len(batch)
+        yield batch
+    timings = getattr(svc, 'group_timings', None) or {}
+    if timings:
+        slowest = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)[:3]
+        detail = ', '.join(f"{group} {n} in {seconds:.2f}s" for group, (n, seconds) in slowest)
+        print(f"Accounts by group: {count} accounts from {len(timings)} groups in "
+              f"{time.time() - started:.2f}s (slowest: {detail})")
+
+def _account_batches_by_range(svc, start=1, end=100000):
+    """Yield account batches from a login range scan and log its throughput."""
+    yield from svc.iter_accounts_by_range(start=start, end=end)
+    stats = getattr(svc, 'range_stats', None) or {}
+    if stats:
+        print(f"Accounts by range {start}-{end}: {stats['found']} found, {stats['probed']} probed, "
+              f"{stats['skipped']} skipped as empty in {stats['seconds']:.1f}s ({stats['rate']:.0f} logins/s)")
+
+def _accounts_frame(batches):
+    """Collect account batches into a DataFrame through a ColumnSink (empty when none)."""
+    sink = ColumnSink()
+    for batch in batches:
+        sink.append(batch)
+    return sink.frame() if len(sink) else pd.DataFrame()
+
+def accounts_updater_runner(interval_seconds=300, use_groups=True, stop_event=None, incremental=True):
+    """Runner loop that periodically refreshes the accounts cache. The first
+    pass and every ACCOUNTS_FULL_REFRESH_EVERY-th pass re-fetch all accounts;
+    with `incremental` the passes in between only merge changed accounts
+    (see `_refresh_accounts_incremental`). The function will run until
+    `stop_event` is set.
     """
-    print(f"Accounts updater runner started (interval={interval_seconds}s)")
+    print(f"Accounts updater runner started (interval={interval_seconds}s, incremental={incremental})")
+    passes = 0
     while not (stop_event and stop_event.is_set()):
         try:
-            # Force a fresh fetch from MT5 and persist to cache file
-            try:
-                # Use the non-Streamlit helper to fetch and persist accounts so
-                # background threads do not call Streamlit cache APIs.
-                _fetch_accounts_from_mt5(use_groups)
-            except Exception as e:
-                print(f"Accounts updater: error fetching from MT5: {e}")
+            # Use the non-Streamlit helpers to fetch and persist accounts so
+            # background threads do not call Streamlit cache APIs.
+            refreshed = None
+            if incremental and passes % ACCOUNTS_FULL_REFRESH_EVERY:
+                try:
+                    refreshed = _refresh_accounts_incremental(use_groups)
+                except Exception as e:
+                    print(f"Accounts updater: incremental refresh failed, falling back to a full fetch: {e}")
+            if refreshed is None:
+                try:
+                    _fetch_accounts_from_mt5(use_groups)
+                except Exception as e:
+                    print(f"Accounts updater: error fetching from MT5: {e}")
+            passes += 1
         except Exception as e:
             print(f"Accounts updater unexpected error: {e}")
 
@@ -65,7 +169,7 @@ def accounts_updater_runner(interval_seconds=300, use_groups=True, stop_event=No
 
     print("Accounts updater runner stopping")
 
-def start_accounts_updater(interval_seconds=300, use_groups=True):
+def start_accounts_updater(interval_seconds=300, use_groups=True, incremental=True):
     """Start the background thread that periodically updates accounts cache.
     Safe to call multiple times; will not start duplicate threads.
     Returns the thread object.
@@ -75,7 +179,7 @@ def start_accounts_updater(interval_seconds=300, use_groups=True):
         return accounts_updater_thread
 
     accounts_updater_stop_event = threading.Event()
-    accounts_updater_thread = threading.Thread(target=accounts_updater_runner, args=(interval_seconds, use_groups, accounts_updater_stop_event), daemon=True)
+    accounts_updater_thread = threading.Thread(target=accounts_updater_runner, args=(interval_seconds, use_groups, accounts_updater_stop_event, incremental), daemon=True)
     accounts_updater_thread.start()
     return accounts_updater_thread
 
@@ -90,9 +194,18 @@ def stop_accounts_updater(timeout=5):
     except Exception:
         pass
 
+def _new_positions_cache(scanning):
+    """Return an empty positions cache whose store keeps a running
+    login x symbol exposure aggregate in step with every position change.
+    """
+    store = PositionsStore()
+    exposure = RunningExposure()
+    store.add_listener(exposure)
+    return {'data': store, 'exposure': exposure, 'timestamp': 0, 'scanning': scanning, 'progress': {'current': 0, 'total': 0}, 'full_scan_done': False, 'stored_tickets': []}
+
 def get_initial_caches():
     """Get initial caches without loading from files"""
-    positions_cache = {'data': None, 'timestamp': 0, 'scanning': True, 'progress': {'current': 0, 'total': 0}, 'full_scan_done': False, 'stored_tickets': []}
+    positions_cache = _new_positions_cache(scanning=True)
     accounts_cache = {'timestamp': 0, 'scanning': False}
     return positions_cache, accounts_cache
 
@@ -101,6 +214,23 @@ positions_cache_global = None
 positions_scanner_thread = None
 positions_scanner_stop_event = None
 
+# Live book fed by MT5 pump notifications. While it is subscribed the scanner
+# only runs a slow reconciliation sweep instead of re-polling every 5 seconds.
+positions_live_book = None
+LIVE_RECONCILE_INTERVAL = 300
+# Failed subscribes are retried after LIVE_RETRY_DELAY seconds, doubling up to
+# LIVE_RECONCILE_INTERVAL; polling scans continue meanwhile.
+LIVE_RETRY_DELAY = 10
+positions_live_retry = CircuitBreaker(base_delay=LIVE_RETRY_DELAY, max_delay=LIVE_RECONCILE_INTERVAL)
+# Scanner time budgets in seconds: one MT5 request and one whole scan pass.
+# Logins that overrun are deferred to the next pass.
+SCAN_CALL_BUDGET = 10
+SCAN_PASS_BUDGET = 120
+
+# Monotonic version of published positions snapshots
+positions_snapshot_version = 0
+positions_snapshot_lock = threading.Lock()
+
 def get_shared_positions_cache():
     """Return the process-shared positions cache dict."""
     global positions_cache_global
@@ -144,12 +274,63 @@ def save_scanning_status(status):
     pass
 
 def load_positions_cache():
-    """Return default positions cache"""
-    return {'data': None, 'timestamp': 0, 'scanning': False, 'progress': {'current': 0, 'total': 0}, 'full_scan_done': False, 'stored_tickets': []}
+    """Return the positions cache, seeded from the snapshot persisted by the
+    last run when there is one. That snapshot is served immediately, marked
+    stale, and scanning is enabled so the background scanner reconciles it
+    with MT5 (incrementally when the saved account layout is available).
+    """
+    global positions_snapshot_version
+    positions_cache = _new_positions_cache(scanning=False)
+    snapshot, extra = load_snapshot(POSITIONS_SNAPSHOT_DIR)
+    if snapshot is None:
+        return positions_cache
+
+    store = positions_cache['data']
+    store.replace_all(snapshot.to_frame().drop(columns=['Group']).to_dict('records'))
+    snapshot = snapshot.replace(source_version=store.version)
+    with positions_snapshot_lock:
+        positions_snapshot_version = max(positions_snapshot_version, snapshot.version)
+    publish_exposure(snapshot, positions_cache['exposure'])
+
+    group_logins = extra.get('group_logins') or {}
+    positions_cache.update({
+        'snapshot': snapshot,
+        'timestamp': snapshot.timestamp,
+        'scanning': True,
+        'stored_tickets': store.tickets(),
+        'saved_version': snapshot.version,
+    })
+    if group_logins:
+        positions_cache.update({
+            'full_scan_done': True,
+            'group_logins': group_logins,
+            'logins': [login for logins in group_logins.values() for login in logins],
+            'login_groups': {login: group for group, logins in group_logins.items() for login in logins},
+            'fingerprints': {login: tuple(fp) for login, fp in (extra.get('fingerprints') or {}).items()},
+            'accounts_timestamp': extra.get('accounts_timestamp', 0),
+        })
+    print(f"Loaded persisted positions snapshot: {len(snapshot)} positions from {time.strftime('%H:%M:%S', time.localtime(snapshot.timestamp))} (stale until reconciled)")
+    return positions_cache
 
 def save_positions_cache(cache):
-    """No-op: removed JSON storage"""
-    pass
+    """Persist the last published snapshot together with the scanner's account
+    layout and fingerprints, so a restart can serve it and reconcile
+    incrementally. Stale or already saved snapshots are skipped.
+    """
+    snapshot = cache.get('snapshot')
+    if snapshot is None or snapshot.stale or cache.get('saved_version') == snapshot.version:
+        return
+    extra = {
+        'group_logins': cache.get('group_logins') or {},
+        'fingerprints': {login: list(fp) for login, fp in (cache.get('fingerprints') or {}).items()},
+        'accounts_timestamp': cache.get('accounts_timestamp', 0),
+    }
+    try:
+        save_snapshot(snapshot, POSITIONS_SNAPSHOT_DIR, extra)
+        cache['saved_version'] = snapshot.version
+        cache['saved_at'] = time.time()
+    except Exception as e:
+        print(f"Error saving positions snapshot: {e}")
 
 @st.cache_data(ttl=60)
 def load_from_mt5(use_groups=True):
@@ -163,180 +344,645 @@ def load_from_mt5(use_groups=True):
 
 def _fetch_accounts_from_mt5(use_groups=True):
     """Fetch accounts directly from MT5 (no Streamlit cache). Returns DataFrame
-    and persists to the local JSON cache file. This is safe to call from
+    and persists it to the local accounts store. This is safe to call from
     background threads.
     """
     svc = MT5Service()   # persistent connection
 
     if use_groups:
-        accounts = svc.list_accounts_by_groups()
+        df = _accounts_frame(_account_batches_by_groups(svc))
     else:
-        accounts = svc.list_accounts_by_range(start=1, end=100000)
+        df = _accounts_frame(_account_batches_by_range(svc))
 
-    if not accounts:
-        return pd.DataFrame()
+    if df.empty:
+        return df
 
-    df = pd.json_normalize(accounts)
     # persist fetched accounts to local cache so clients can read without hitting MT5
+    version = None
     try:
-        save_accounts_cache(df)
+        version = save_accounts_cache(df)
     except Exception as e:
         print(f"Error saving accounts cache from fetch helper: {e}")
+    # refresh the process-shared table in place for every session
+    df = _publish_accounts(df, version or f"mt5:{time.time_ns()}")
+    _remember_accounts(df)
     return df
 
-def scan_single_account(login, svc, accounts_df):
-    """Helper function to scan positions for a single account"""
+# Per-login fingerprint of the rows in the shared accounts table, compared by
+# incremental refreshes
+ACCOUNT_COMPARE_FIELDS = ('name', 'email', 'group', 'leverage', 'balance', 'equity', 'profit')
+accounts_seen = {}
+
+def _account_fingerprint(row):
+    values = []
+    for field in ACCOUNT_COMPARE_FIELDS:
+        value = row.get(field)
+        if value is None or value != value:  # None / NaN are stored as ''
+            value = ''
+        values.append(round(float(value), 2) if isinstance(value, float) else value)
+    return tuple(values)
+
+def _remember_accounts(df, logins=None):
+    """Record the fingerprints of `df` rows (only `logins` when given)."""
+    global accounts_seen
+    if 'login' not in df.columns:
+        return
+    rows = df if logins is None else df[df['login'].isin(logins)]
+    seen = {} if logins is None else accounts_seen
+    columns = [c for c in ('login',) + ACCOUNT_COMPARE_FIELDS if c in rows.columns]
+    for row in rows[columns].to_dict('records'):
+        seen[str(row['login'])] = _account_fingerprint(row)
+    accounts_seen = seen
+
+def _merge_accounts(df, updates, removed):
+    """Return a new accounts table with `updates` ({login: {column: value}})
+    applied to existing rows or appended as new rows and `removed` logins
+    dropped. Columns missing from an update keep their current value; `df`
+    itself is not modified.
+    """
+    table = df.set_index(df['login'].astype(str), drop=False)
+    table = table.drop(index=table.index.intersection(list(removed)))
+    if updates:
+        changes = pd.DataFrame.from_dict(updates, orient='index')
+        changes['login'] = changes.index
+        existing = changes.index.intersection(table.index)
+        for column in changes.columns.intersection(table.columns):
+            values = changes.loc[existing, column].dropna()
+            if len(values):
+                try:
+                    table.loc[values.index, column] = values
+                except (TypeError, ValueError):
+                    # e.g. floats into an int column: widen instead of failing
+                    table[column] = table[column].astype(object)
+                    table.loc[values.index, column] = values
+        added = changes.loc[changes.index.difference(table.index)]
+        if len(added):
+            table = pd.concat([table, added])
+    return table.reset_index(drop=True)
+
+def _refresh_accounts_incremental(use_groups=True):
+    """Merge only added, changed and removed accounts into the shared table.
+
+    When the positions live book receives MT5 user and account notifications,
+    the logins they touched are taken from it without any MT5 request.
+    Otherwise each group is read with one UserGetByGroup and one account
+    state request and rows are compared with the fingerprints of the previous
+    pass, so unchanged accounts are neither re-fetched per user nor rewritten.
+    Returns the published DataFrame, or None when an incremental pass is not
+    possible (the caller then runs a full fetch).
+    """
+    current = get_shared_accounts()
+    if current.empty or 'login' not in current.columns or not accounts_seen:
+        return None
+
+    book = positions_live_book
+    if book is not None and book.tracks_accounts:
+        source = 'notifications'
+        changed, removed = book.drain_account_changes()
+        updates = {}
+        for login in changed - removed:
+            meta = book.users.get(login) or {}
+            state = book.accounts.get(login) or {}
+            row = {}
+            if meta:
+                row.update(name=meta.get('Name'), email=meta.get('Email'), group=meta.get('Group'), leverage=meta.get('Leverage'))
+            if state:
+                row.update(balance=state['balance'], equity=state['equity'], profit=state['profit'])
+            elif row and login not in accounts_seen:
+                # like a full fetch, a new user without account state starts at zero
+                row.update(balance=0.0, equity=0.0, profit=0.0)
+            if row:
+                updates[login] = row
+    elif use_groups:
+        source = 'group comparison'
+        svc = MT5Service()
+        fetched = {}
+        for group in svc.get_group_list():
+            users = svc.list_users_by_group(group)
+            if users is None:
+                return None
+            states = svc.get_account_states_by_group(group) or {}
+            for user in users:
+                login = str(user['login'])
+                row = dict(user, login=login)
+                state = states.get(login)
+                if state:
+                    row.update(balance=state['balance'], equity=state['equity'], profit=state['profit'])
+                fetched[login] = row
+        updates = {login: row for login, row in fetched.items() if _account_fingerprint(row) != accounts_seen.get(login)}
+        removed = set(accounts_seen) - set(fetched)
+    else:
+        # range enumeration has no cheap per-group comparison
+        return None
+
+    if not updates and not removed:
+        print(f"Accounts updater: incremental refresh ({source}): no changes in {len(current)} accounts")
+        return current
+
+    merged = _merge_accounts(current, updates, removed)
+    version = save_accounts_cache(merged)
+    df = _publish_accounts(merged, version or f"mt5:{time.time_ns()}")
+    for login in removed:
+        accounts_seen.pop(login, None)
+    _remember_accounts(df, list(updates))
+    print(f"Accounts updater: incremental refresh ({source}): merged {len(updates)} changed, removed {len(removed)}, {len(df)} accounts")
+    return df
+
+def _group_logins(accounts_df):
+    """Map group name -> list of logins. Logins without a group are keyed by None."""
+    groups = {}
+    if accounts_df is None or accounts_df.empty or 'login' not in accounts_df.columns:
+        return groups
+    group_col = accounts_df['group'] if 'group' in accounts_df.columns else [None] * len(accounts_df)
+    for login, group in zip(accounts_df['login'].astype(str), group_col):
+        groups.setdefault(group or None, []).append(login)
+    return groups
+
+def _position_row(login, p):
+    """Build a scanner cache row from an MT5Service position dict. Account
+    metadata is not copied onto rows; snapshots join it from the accounts table.
+    """
+    position_data = {
+        'Login': str(login),
+        'ID': p.get('id'),
+        'Symbol': p.get('symbol'),
+        'Vol': p.get('volume'),
+        'Price': p.get('price'),
+        'P/L': p.get('profit'),
+        'Type': p.get('type'),
+        'Date': p.get('date')
+    }
+    return position_data
+
+def _call_deadline(pass_deadline=None):
+    """Deadline for one scanner request: SCAN_CALL_BUDGET, capped by the pass deadline."""
+    deadline = deadline_in(SCAN_CALL_BUDGET)
+    return deadline if pass_deadline is None else min(deadline, pass_deadline)
+
+def scan_single_account(login, svc, pass_deadline=None):
+    """Helper function to scan positions for a single account. Raises
+    MT5Timeout when the request overruns its budget.
+    """
     positions_data = []
     try:
-        positions = svc.get_open_positions(login)
-        if positions:
-            for p in positions:
-                position_data = {
-                    'Login': login,
-                    'ID': p.get('id'),
-                    'Symbol': p.get('symbol'),
-                    'Vol': p.get('volume'),
-                    'Price': p.get('price'),
-                    'P/L': p.get('profit'),
-                    'Type': p.get('type'),
-                    'Date': p.get('date')
-                }
-                # Add account details
-                account_row = accounts_df[accounts_df['login'] == login]
-                if not account_row.empty:
-                    position_data['Name'] = account_row['name'].iloc[0] if 'name' in account_row.columns else ''
-                    position_data['Email'] = account_row['email'].iloc[0] if 'email' in account_row.columns else ''
-                    position_data['Group'] = account_row['group'].iloc[0] if 'group' in account_row.columns else ''
-                positions_data.append(position_data)
+        positions = svc.get_open_positions(login, deadline=_call_deadline(pass_deadline))
+        for p in positions or []:
+            positions_data.append(_position_row(login, p))
+    except MT5Timeout:
+        raise
     except Exception as e:
         print(f"Error scanning positions for login {login}: {e}")
     return positions_data
 
+def scan_group_positions(group, logins, svc, pass_deadline=None):
+    """Scan positions for every login of `group` with a single bulk request.
+    Returns (rows, deferred logins).
+
+    Falls back to one request per login when the group is unknown or the bulk
+    request fails; logins whose request overran are deferred.
+    """
+    positions = svc.get_open_positions_by_group(group, deadline=_call_deadline(pass_deadline)) if group else None
+    if positions is None:
+        positions_data = []
+        deferred = []
+        for login in logins:
+            try:
+                positions_data.extend(scan_single_account(login, svc, pass_deadline))
+            except MT5Timeout:
+                deferred.append(login)
+        return positions_data, deferred
+
+    return [_position_row(p.get('login'), p) for p in positions], []
+
+def _load_scan_accounts(svc, positions_cache, current_time):
+    """Fetch accounts for the scanner and store the login/group layout in the cache.
+    Returns True when accounts were found.
+    """
+    accounts_df = _accounts_frame(_account_batches_by_groups(svc))
+    if accounts_df.empty:
+        print("No accounts from groups, trying range scan...")
+        accounts_df = _accounts_frame(_account_batches_by_range(svc))
+    if accounts_df.empty or 'login' not in accounts_df.columns:
+        return False
+    accounts_df['login'] = accounts_df['login'].astype(str)
+
+    # store the discovered layout so incremental scans don't need to re-fetch accounts
+    positions_cache['logins'] = list(accounts_df['login'].unique())
+    positions_cache['group_logins'] = _group_logins(accounts_df)
+    positions_cache['login_groups'] = {login: group for group, logins in positions_cache['group_logins'].items() for login in logins}
+    positions_cache['accounts_timestamp'] = current_time
+    print(f"Found {len(positions_cache['logins'])} accounts in {len(positions_cache['group_logins'])} groups to scan")
+    return True
+
+def _fingerprint(state):
+    """Cheap per-login change marker built from account state."""
+    return (
+        round(state.get('balance', 0.0), 2),
+        round(state.get('equity', 0.0), 2),
+        round(state.get('margin', 0.0), 2),
+        round(state.get('profit', 0.0), 2),
+    )
+
+def _rows_by_login(rows):
+    by_login = {}
+    for row in rows:
+        by_login.setdefault(str(row.get('Login')), []).append(row)
+    return by_login
+
+def scan_group_full(group, logins, svc, pass_deadline=None):
+    """Fetch account fingerprints and positions for every login of `group`.
+    Returns (fingerprints, rows, deferred logins). Fingerprints are read first
+    so a change that lands between the two requests is picked up by the next
+    incremental pass; deferred logins get none, so that pass re-fetches them.
+    """
+    states = svc.get_account_states_by_group(group, deadline=_call_deadline(pass_deadline)) if group else None
+    fingerprints = {login: _fingerprint(state) for login, state in (states or {}).items()}
+    rows, deferred = scan_group_positions(group, logins, svc, pass_deadline)
+    for login in deferred:
+        fingerprints.pop(login, None)
+    return fingerprints, rows, deferred
+
+def scan_group_delta(group, logins, svc, fingerprints=None, pass_deadline=None):
+    """Re-fetch positions only for logins of `group` whose fingerprint moved.
+
+    Returns (new_fingerprints, patches, deferred) where `patches` maps each
+    changed login to its fresh list of position rows (empty when it has no
+    positions left) and `deferred` lists changed logins whose request overran;
+    they are left out of `new_fingerprints` so the next pass retries them.
+    When the group state cannot be read every login counts as changed.
+    Logins missing from the group state are not re-fetched: they were deleted
+    or moved, and the caller drops them (see `_forget_logins`).
+    """
+    fingerprints = fingerprints or {}
+    states = svc.get_account_states_by_group(group, deadline=_call_deadline(pass_deadline)) if group else None
+    if states is None:
+        new_fingerprints = {}
+        changed = list(logins)
+    else:
+        new_fingerprints = {login: _fingerprint(state) for login, state in states.items()}
+        # includes logins that appeared in the group since the last pass
+        changed = [login for login, fingerprint in new_fingerprints.items() if fingerprint != fingerprints.get(login)]
+
+    if not changed:
+        return new_fingerprints, {}, []
+
+    # When most of the group moved, one bulk request is cheaper than many single ones
+    if group and len(changed) * 2 > len(logins):
+        rows = svc.get_open_positions_by_group(group, deadline=_call_deadline(pass_deadline))
+        if rows is not None:
+            by_login = _rows_by_login(_position_row(p.get('login'), p) for p in rows)
+            return new_fingerprints, {login: by_login.get(login, []) for login in changed}, []
+
+    patches = {}
+    deferred = []
+    for login in changed:
+        try:
+            patches[login] = scan_single_account(login, svc, pass_deadline)
+        except MT5Timeout:
+            deferred.append(login)
+            new_fingerprints.pop(login, None)
+    return new_fingerprints, patches, deferred
+
+def _set_progress(positions_cache, current, total, current_login=''):
+    """Publish scan progress as a new dict (single reference swap) so readers
+    never see a half-updated progress record.
+    """
+    positions_cache['progress'] = {'current': current, 'total': total, 'current_login': current_login}
+
+def _run_groups(task, group_logins, pass_deadline, *args):
+    """Run `task(group, logins, *args, pass_deadline=...)` for every group on
+    up to 10 threads. Yields (group, future) as groups finish, then
+    (group, None) for groups still unfinished when `pass_deadline` passed;
+    those are abandoned (queued ones cancelled) instead of holding up the pass.
+    """
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(10, len(group_logins))))
+    futures = {executor.submit(task, group, logins, *args, pass_deadline=pass_deadline): group
+               for group, logins in group_logins.items()}
+    pending = set(futures)
+    try:
+        for future in concurrent.futures.as_completed(futures, timeout=max(0.0, pass_deadline - time.monotonic())):
+            pending.discard(future)
+            yield futures[future], future
+    except concurrent.futures.TimeoutError:
+        pass
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    for future in pending:
+        yield futures[future], None
+
+def _scan_positions(svc, positions_cache):
+    """Scan open positions group by group (one bulk request per group) into the
+    cache's PositionsStore and return the combined list of position rows. Also
+    records the per-login fingerprints used by incremental passes.
+
+    The pass is bounded by SCAN_PASS_BUDGET and each request by
+    SCAN_CALL_BUDGET. Logins that overrun keep their previous rows and are
+    listed in positions_cache['deferred'] for the next (incremental) pass.
+    The store is only patched login by login as groups finish, so live book
+    updates for other logins made during the pass are kept.
+    """
+    store = positions_cache['data']
+    group_logins = positions_cache.get('group_logins') or {}
+    total_accounts = sum(len(logins) for logins in group_logins.values())
+    _set_progress(positions_cache, 0, total_accounts)
+    previous_logins = store.logins()
+
+    scanned = 0
+    all_positions = []
+    fingerprints = {}
+    deferred = []
+    for group, future in _run_groups(scan_group_full, group_logins, deadline_in(SCAN_PASS_BUDGET), svc):
+        if future is None:
+            deferred.extend(group_logins[group])
+            print(f"Deferred group {group}: scan pass budget exhausted")
+            continue
+        try:
+            group_fingerprints, positions_data, group_deferred = future.result()
+            fingerprints.update(group_fingerprints)
+            all_positions.extend(positions_data)
+            deferred.extend(group_deferred)
+            # Update the store per login for dynamic display
+            by_login = _rows_by_login(positions_data)
+            for login in (set(group_logins[group]) - set(group_deferred)) | set(by_login):
+                store.replace_login(login, by_login.get(login, []))
+            scanned += len(group_logins[group])
+            _set_progress(positions_cache, scanned, total_accounts, group or '')
+            print(f"Scanned group {group}: {scanned}/{total_accounts} accounts, found {len(all_positions)} positions so far")
+        except MT5Timeout as e:
+            deferred.extend(group_logins[group])
+            print(f"Deferred group {group}: {e}")
+        except Exception as e:
+            print(f"Error processing future for group {group}: {e}")
+
+    positions_cache['fingerprints'] = fingerprints
+    positions_cache['deferred'] = deferred
+    # drop rows held from before the pass for logins no longer part of the account layout
+    layout = {login for logins in group_logins.values() for login in logins}
+    for login in previous_logins:
+        if login not in layout:
+            store.replace_login(login, [])
+    return all_positions
+
+def _learn_logins(positions_cache, found):
+    """Add logins first seen by a scan pass to the cache's account layout.
+
+    `found` maps each group to the logins its account states reported; a
+    login filed under another group moves to this one. The layout dicts are
+    replaced rather than mutated, since snapshot publishing reads them.
+    """
+    login_groups = positions_cache.get('login_groups') or {}
+    moved = {login: group for group, logins in found.items() for login in logins if login_groups.get(login) != group}
+    if not moved:
+        return
+    group_logins = {group: [login for login in logins if login not in moved]
+                    for group, logins in (positions_cache.get('group_logins') or {}).items()}
+    for login, group in moved.items():
+        group_logins.setdefault(group, []).append(login)
+    positions_cache['group_logins'] = group_logins
+    positions_cache['login_groups'] = {**login_groups, **moved}
+    positions_cache['logins'] = [login for logins in group_logins.values() for login in logins]
+    print(f"Scan layout: added {len(moved)} new or moved logins")
+
+def _forget_logins(positions_cache, gone):
+    """Drop logins that disappeared from their group's account states: their
+    rows leave the store and their fingerprints and layout entries are
+    removed, so later passes no longer request them. Layout dicts are
+    replaced, as in `_learn_logins`.
+    """
+    if not gone:
+        return
+    store = positions_cache['data']
+    fingerprints = positions_cache.setdefault('fingerprints', {})
+    for login in gone:
+        store.replace_login(login, [])
+        fingerprints.pop(login, None)
+    group_logins = {group: [login for login in logins if login not in gone]
+                    for group, logins in (positions_cache.get('group_logins') or {}).items()}
+    positions_cache['group_logins'] = group_logins
+    positions_cache['login_groups'] = {login: group for login, group in (positions_cache.get('login_groups') or {}).items()
+                                       if login not in gone}
+    positions_cache['logins'] = [login for logins in group_logins.values() for login in logins]
+    print(f"Scan layout: dropped {len(gone)} deleted logins")
+
+def _scan_positions_incremental(svc, positions_cache):
+    """Patch the cache's PositionsStore in place for logins whose fingerprint
+    changed. Returns the number of re-fetched logins. Bounded like
+    `_scan_positions`; deferred logins keep no fingerprint, so the next pass
+    re-fetches them. Logins no group reports any more are dropped.
+    """
+    group_logins = positions_cache.get('group_logins') or {}
+    fingerprints = positions_cache.setdefault('fingerprints', {})
+    store = positions_cache['data']
+    total_accounts = sum(len(logins) for logins in group_logins.values())
+    _set_progress(positions_cache, 0, total_accounts)
+
+    scanned = 0
+    changed_count = 0
+    deferred = []
+    found = {}
+    missing = set()
+    for group, future in _run_groups(scan_group_delta, group_logins, deadline_in(SCAN_PASS_BUDGET), svc, fingerprints):
+        if future is None:
+            # fingerprints stay as they were, so the next pass sees the same changes
+            deferred.extend(group_logins[group])
+            continue
+        try:
+            group_fingerprints, patches, group_deferred = future.result()
+            fingerprints.update(group_fingerprints)
+            found[group] = list(group_fingerprints)
+            for login, rows in patches.items():
+                store.replace_login(login, rows)
+                if login not in group_fingerprints:
+                    fingerprints.pop(login, None)
+            for login in group_deferred:
+                fingerprints.pop(login, None)
+            deferred.extend(group_deferred)
+            # an empty group state is more likely a failed read than a deleted group
+            if group_fingerprints or patches:
+                missing.update(set(group_logins[group]) - set(group_fingerprints) - set(patches) - set(group_deferred))
+            changed_count += len(patches)
+            scanned += len(group_logins[group])
+            _set_progress(positions_cache, scanned, total_accounts, group or '')
+        except MT5Timeout:
+            deferred.extend(group_logins[group])
+        except Exception as e:
+            print(f"Error processing future for group {group}: {e}")
+
+    positions_cache['deferred'] = deferred
+    _learn_logins(positions_cache, found)
+    # a login missing from one group but reported by another has moved, not gone
+    _forget_logins(positions_cache, missing - set(deferred) - {login for logins in found.values() for login in logins})
+    if deferred:
+        print(f"Incremental scan: deferred {len(deferred)} logins to the next pass")
+    return changed_count
+
+def _login_groups(positions_cache):
+    """Login -> group map for snapshots, overlaid with live user updates."""
+    groups = positions_cache.get('login_groups') or {}
+    if positions_live_book is not None and positions_live_book.users:
+        groups = dict(groups)
+        groups.update({login: meta.get('Group') for login, meta in positions_live_book.users.items()})
+    return groups
+
+def publish_positions_snapshot(positions_cache):
+    """Build a new immutable PositionsSnapshot from the store and publish it with
+    a single reference swap. Readers holding the previous snapshot keep a
+    consistent view; new readers see the new one. The cache's running exposure
+    aggregate is published with it. Only the store columns and the exposure
+    arrays are copied under the store lock; the snapshot and frames are built
+    outside it, so live book deltas are not held up. Returns the snapshot.
+    """
+    global positions_snapshot_version
+    store = positions_cache['data']
+    running = positions_cache.get('exposure')
+    with positions_snapshot_lock:
+        with store.locked():
+            columns, symbols, source_version = store.columns()
+            # the running aggregate matches these columns: no recompute
+            exposure = running.copy() if running is not None else None
+        positions_snapshot_version += 1
+        snapshot = PositionsSnapshot.from_columns(
+            columns,
+            symbols,
+            _login_groups(positions_cache),
+            version=positions_snapshot_version,
+            timestamp=time.time(),
+            source_version=source_version,
+        )
+        if exposure is not None:
+            publish_exposure(snapshot, exposure)
+        positions_cache['snapshot'] = snapshot
+    return snapshot
+
+def get_positions_snapshot():
+    """Return the latest published PositionsSnapshot of the process-shared cache."""
+    cache = positions_cache_global
+    snapshot = cache.get('snapshot') if cache else None
+    return snapshot if snapshot is not None else PositionsSnapshot.empty()
+
+def _start_live_book(svc, positions_cache):
+    """Subscribe a LiveBook that applies MT5 position/user/account notifications
+    directly to the cache's PositionsStore. Returns the book, or None when the
+    pump sinks could not be registered (the scanner then keeps polling).
+    """
+    book = LiveBook(positions_cache['data'], _position_row)
+    try:
+        if not book.subscribe(svc):
+            # drop any user/account sinks that were accepted, a retry registers new ones
+            book.unsubscribe(svc)
+            print("Live book: position sink not accepted, continuing with polling scans")
+            return None
+    except Exception as e:
+        print(f"Live book: failed to subscribe to MT5 notifications: {e}")
+        return None
+    positions_cache['live'] = True
+    print("Live book subscribed to MT5 position/user/account notifications")
+    return book
+
+def _check_live_book(positions_cache):
+    """Drop the live book when the primary MT5 connection was replaced or
+    cannot be reached. Its sinks were registered on the old connection, so
+    polling scans take over until it is subscribed again on the new one.
+    """
+    global positions_live_book
+    book = positions_live_book
+    if book is None:
+        return
+    try:
+        svc = MT5Service()
+        svc.connect()
+        current = book.is_current(svc)
+    except Exception as e:
+        print(f"Live book: MT5 connection check failed: {e}")
+        current = False
+    if not current:
+        print("Live book: MT5 connection lost or replaced, polling until notifications are re-subscribed")
+        positions_live_book = None
+        positions_cache['live'] = False
+
 def background_position_scanner(positions_cache):
-    """Background thread function to continuously scan open positions simultaneously"""
+    """Background thread function to continuously scan open positions simultaneously.
+
+    Once a live book is subscribed to MT5 notifications, positions are kept
+    current by pump deltas and incremental scans only run every
+    LIVE_RECONCILE_INTERVAL seconds to reconcile missed events. A failed
+    subscribe is retried with backoff (positions_live_retry), and after an MT5
+    reconnect the book is dropped and subscribed again on the new connection.
+    """
+    global positions_live_book
 
     print("Background position scanner thread started!")
     while True:
         try:
             current_time = time.time()
+            _check_live_book(positions_cache)
             # Check if we need to scan (only when manually triggered)
-            if positions_cache['scanning']:
+            # While the live book is subscribed it keeps positions current, so
+            # rescans only run as periodic reconciliation sweeps.
+            live_and_fresh = (
+                positions_live_book is not None
+                and positions_cache.get('full_scan_done', False)
+                and current_time - positions_cache.get('last_reconcile', 0) < LIVE_RECONCILE_INTERVAL
+            )
+            if positions_cache['scanning'] and not live_and_fresh:
                 positions_cache['scanning'] = True
                 print(f"Starting background position scan at {time.strftime('%H:%M:%S')}")
 
                 svc = MT5Service()
 
+                if positions_live_book is None and positions_live_retry.allow():
+                    positions_live_book = _start_live_book(svc, positions_cache)
+                    if positions_live_book is None:
+                        positions_live_retry.record_failure()
+                    else:
+                        positions_live_retry.record_success()
+
                 if not positions_cache.get('full_scan_done', False):
                     # Full scan: scan all accounts
                     print("Performing full scan of all accounts...")
-                    accounts = svc.list_accounts_by_groups()
-                    if not accounts:
-                        print("No accounts from groups, trying range scan...")
-                        accounts = svc.list_accounts_by_range(start=1, end=100000)
-
-                    if accounts:
-                        print(f"Found {len(accounts)} accounts to scan")
-                        accounts_df = pd.json_normalize(accounts)
-                        if 'login' in accounts_df.columns:
-                            accounts_df['login'] = accounts_df['login'].astype(str)
-
-                            logins = accounts_df['login'].unique()
-                            # store the discovered logins so incremental scans don't need to re-fetch accounts
-                            positions_cache['logins'] = list(logins)
-                            positions_cache['accounts_timestamp'] = current_time
-                            total_accounts = len(logins)
-                            positions_cache['progress']['total'] = total_accounts
-                            positions_cache['progress']['current'] = 0
-                            positions_cache['progress']['current_login'] = ''
-
-                            # Scan positions for all accounts simultaneously
-                            all_positions = []
-                            with concurrent.futures.ThreadPoolExecutor(max_workers=min(10, total_accounts)) as executor:
-                                futures = {executor.submit(scan_single_account, login, svc, accounts_df): login for login in logins}
-                                for future in concurrent.futures.as_completed(futures):
-                                    login = futures[future]
-                                    try:
-                                        positions_data = future.result()
-                                        all_positions.extend(positions_data)
-                                        positions_cache['progress']['current'] += 1
-                                        positions_cache['progress']['current_login'] = login
-                                        # Update cache incrementally for dynamic display
-                                        positions_cache['data'] = all_positions
-                                        if positions_cache['progress']['current'] % 100 == 0:
-                                            print(f"Scanned {positions_cache['progress']['current']}/{total_accounts} accounts, found {len(all_positions)} positions so far")
-                                    except Exception as e:
-                                        print(f"Error processing future for login {login}: {e}")
-
-                            # Store tickets for incremental updates
-                            stored_tickets = [p['ID'] for p in all_positions if p.get('ID')]
-                            positions_cache['stored_tickets'] = stored_tickets
-                            positions_cache['full_scan_done'] = True
-
-                            # Final update cache
-                            positions_cache['data'] = all_positions
-                            positions_cache['timestamp'] = current_time
-                            save_positions_cache(positions_cache)  # Persist cache to file
-                            print(f"Full scan completed: {len(all_positions)} positions found from {total_accounts} accounts. Stored {len(stored_tickets)} tickets for incremental updates.")
-
-                            # Sleep for 5 seconds before rescanning if still active
-                            time.sleep(5)
+                    if _load_scan_accounts(svc, positions_cache, current_time):
+                        all_positions = _scan_positions(svc, positions_cache)
+
+                        # Store tickets for incremental updates
+                        stored_tickets = positions_cache['data'].tickets()
+                        positions_cache['stored_tickets'] = stored_tickets
+                        positions_cache['full_scan_done'] = True
+                        positions_cache['last_reconcile'] = current_time
+
+                        # Final update cache
+                        positions_cache['timestamp'] = current_time
+                        publish_positions_snapshot(positions_cache)
+                        save_positions_cache(positions_cache)  # Persist cache to file
+                        print(f"Full scan completed: {len(all_positions)} positions found from {len(positions_cache['logins'])} accounts "
+                              f"({len(positions_cache['deferred'])} deferred). Stored {len(stored_tickets)} tickets for incremental updates.")
+
+                        # Sleep for 5 seconds before rescanning if still active
+                        time.sleep(5)
                 else:
-                    # Incremental scan: update existing positions using the stored login list
-                    print(f"Performing incremental scan (positions-only for stored logins)...")
-                    logins = positions_cache.get('logins') or []
+                    # Incremental scan: re-fetch only logins whose account fingerprint moved
+                    print("Performing incremental scan (changed logins only)...")
 
-                    # If we don't have stored logins (unlikely), fall back to a lightweight fetch
-                    if not logins:
+                    # If we don't have stored groups (unlikely), fall back to a lightweight fetch
+                    if not positions_cache.get('group_logins'):
                         print("No stored logins found for incremental scan, attempting to fetch accounts once...")
                         try:
-                            accounts = svc.list_accounts_by_groups()
-                            if not accounts:
-                                accounts = svc.list_accounts_by_range(start=1, end=100000)
-                            if accounts:
-                                accounts_df = pd.json_normalize(accounts)
-                                if 'login' in accounts_df.columns:
-                                    accounts_df['login'] = accounts_df['login'].astype(str)
-                                    logins = accounts_df['login'].unique()
-                                    positions_cache['logins'] = list(logins)
-                                    positions_cache['accounts_timestamp'] = current_time
+                            _load_scan_accounts(svc, positions_cache, current_time)
                         except Exception as e:
                             print(f"Incremental scan fallback: failed to fetch accounts: {e}")
 
-                    if logins:
-                        total_accounts = len(logins)
-                        positions_cache['progress']['total'] = total_accounts
-                        positions_cache['progress']['current'] = 0
-                        positions_cache['progress']['current_login'] = ''
-
-                        all_positions = []
-                        with concurrent.futures.ThreadPoolExecutor(max_workers=min(10, total_accounts)) as executor:
-                            # For incremental scanning we can pass an empty accounts_df; scan_single_account will
-                            # still attach account metadata when possible. We provide a small dataframe if available.
-                            accounts_df = None
-                            futures = {executor.submit(scan_single_account, login, svc, accounts_df): login for login in logins}
-                            for future in concurrent.futures.as_completed(futures):
-                                login = futures[future]
-                                try:
-                                    positions_data = future.result()
-                                    all_positions.extend(positions_data)
-                                    positions_cache['progress']['current'] += 1
-                                    positions_cache['progress']['current_login'] = login
-                                    # Update cache incrementally for dynamic display
-                                    positions_cache['data'] = all_positions
-                                    if positions_cache['progress']['current'] % 100 == 0:
-                                        print(f"Scanned {positions_cache['progress']['current']}/{total_accounts} accounts, found {len(all_positions)} positions so far")
-                                except Exception as e:
-                                    print(f"Error processing future for login {login}: {e}")
+                    if positions_cache.get('group_logins'):
+                        changed_count = _scan_positions_incremental(svc, positions_cache)
 
                         # Update stored tickets with all current position IDs
-                        stored_tickets = [p['ID'] for p in all_positions if p.get('ID')]
+                        stored_tickets = positions_cache['data'].tickets()
                         positions_cache['stored_tickets'] = stored_tickets
+                        positions_cache['last_reconcile'] = current_time
 
                         # Final update cache
-                        positions_cache['data'] = all_positions
                         positions_cache['timestamp'] = current_time
+                        publish_positions_snapshot(positions_cache)
                         save_positions_cache(positions_cache)  # Persist cache to file
-                        print(f"Incremental scan completed: {len(all_positions)} positions found from {total_accounts} accounts. Updated stored tickets with {len(stored_tickets)} IDs.")
+                        print(f"Incremental scan completed: re-fetched {changed_count}/{len(positions_cache['logins'])} changed accounts, {len(positions_cache['data'])} positions in book. Updated stored tickets with {len(stored_tickets)} IDs.")
 
                         # Sleep for 5 seconds before rescanning if still active
                         time.sleep(5)
@@ -345,6 +991,14 @@ def background_position_scanner(positions_cache):
                         positions_cache['scanning'] = False
                         save_scanning_status({'scanning': False})
 
+            # Publish a fresh columnar snapshot whenever the store moved
+            # (scan passes, live book deltas or manual scans)
+            snapshot = positions_cache.get('snapshot')
+            if snapshot is None or positions_cache['data'].version != snapshot.source_version:
+                publish_positions_snapshot(positions_cache)
+            if time.time() - positions_cache.get('saved_at', 0) >= POSITIONS_SAVE_INTERVAL:
+                save_positions_cache(positions_cache)
+
         except Exception as e:
             print(f"Error in background position scanner: {e}")
             positions_cache['scanning'] = False
@@ -0,0 +1,65 @@
+import threading
+import time
+
+__all__ = ['CircuitBreaker']
+
+
+class CircuitBreaker:
+    """Failure gate with exponential backoff.
+
+    Closed: calls are allowed. After `threshold` consecutive failures the
+    breaker opens and `allow()` returns False for `base_delay` seconds,
+    doubling after every further failure up to `max_delay`. Once the delay
+    has passed one trial call is let through (half-open); its success closes
+    the breaker, its failure re-opens it with the next delay.
+    """
+
+    def __init__(self, threshold=1, base_delay=1.0, max_delay=60.0):
+        self.threshold = max(1, int(threshold))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_until = 0.0
+        self.last_error = None
+        self._trial = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.failures < self.threshold:
+                return 'closed'
+            return 'half-open' if time.monotonic() >= self.opened_until else 'open'
+
+    def allow(self):
+        """True when a call may proceed. While half-open only one caller gets
+        True until that trial reports back.
+        """
+        with self._lock:
+            if self.failures < self.threshold:
+                return True
+            if time.monotonic() < self.opened_until or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def retry_in(self):
+        """Seconds until the next trial call is allowed (0 when closed)."""
+        with self._lock:
+            return max(0.0, self.opened_until - time.monotonic()) if self.failures >= self.threshold else 0.0
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_until = 0.0
+            self.last_error = None
+            self._trial = False
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.failures += 1
+            self.last_error = None if error is None else str(error)
+            self._trial = False
+            if self.failures >= self.threshold:
+                delay = self.base_delay * 2 ** min(self.failures - self.threshold, 16)
+                self.opened_until = time.monotonic() + min(self.max_delay, delay)
@@ -22,6 +22,8 @@ def main():
     sub_scan.add_argument('--start', required=True, type=int, help='Start login (inclusive)')
     sub_scan.add_argument('--end', required=True, type=int, help='End login (inclusive)')
     sub_scan.add_argument('--workers', type=int, default=8, help='Worker threads')
+    sub_scan.add_argument('--batch-size', type=int, default=100, help='Logins per submitted chunk')
+    sub_scan.add_argument('--full', action='store_true', help='Probe every login instead of the learned login ranges')
     sub_scan.add_argument('--output', help='Optional output JSONL file')
     sub_diag = sub.add_parser('diag', help='Run MT5 connectivity diagnostics')
     sub_diag.add_argument('--sample-login', type=int, help='Optional sample login to check')
@@ -35,8 +37,9 @@ def main():
         accounts = svc.list_accounts_by_index()
         print(json.dumps({'count': len(accounts), 'sample': accounts[:10]}, indent=2, default=str))
     elif args.cmd == 'scan':
-        res = svc.list_accounts_by_range(args.start, args.end, workers=args.workers, output_file=args.output)
-        print(json.dumps({'found': len(res), 'sample': res[:10]}, indent=2, default=str))
+        res = svc.list_accounts_by_range(args.start, args.end, workers=args.workers, batch_size=args.batch_size,
+                                         output_file=args.output, learned=not args.full)
+        print(json.dumps({'found': len(res), 'stats': svc.range_stats, 'sample': res[:10]}, indent=2, default=str))
     elif args.cmd == 'diag':
         # Connectivity diagnostics - don't crash on connection errors
         try:
@@ -59,6 +62,10 @@ def main():
             except Exception:
                 info['last_error'] = None
 
+            pool = svc.pool()
+            if pool is not None:
+                info['pool'] = pool.health()
+
             if args.sample_login:
                 try:
                     info['sample_user'] = {}
@@ -0,0 +1,244 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+__all__ = ['write_columns', 'read_columns', 'read_manifest', 'read_version', 'atomic_write',
+           'frame_to_columns', 'columns_to_frame', 'ColumnSink']
+
+# On-disk layout: one .npy file per column, a JSON manifest naming them and a
+# version sidecar holding the manifest version
+COLUMNAR_FORMAT = 1
+MANIFEST_FILE = 'manifest.json'
+VERSION_FILE = 'version'
+# Attempts made by read_columns when a concurrent write replaces the files
+READ_ATTEMPTS = 3
+
+# Writers of the same directory are serialised so one never removes files
+# another has just referenced from the manifest
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+
+def _write_lock(directory):
+    with _write_locks_guard:
+        return _write_locks.setdefault(os.path.abspath(directory), threading.Lock())
+
+
+def _fsync_directory(directory):
+    """Flush a rename to disk (POSIX only; Windows has no directory handles)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, data):
+    """Replace `path` with `data` (bytes): write a temporary file, fsync it and
+    rename it over `path`. Readers see either the old or the new content.
+    """
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(os.path.dirname(path) or '.')
+
+
+def read_version(directory):
+    """Return the version sidecar of `directory` (a short string), or None.
+    Cheaper than parsing the manifest, so readers use it to skip reloads.
+    """
+    try:
+        with open(os.path.join(directory, VERSION_FILE), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def read_manifest(directory):
+    """Return the manifest stored in `directory`, or None."""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('format') == COLUMNAR_FORMAT else None
+
+
+def write_columns(directory, columns, **fields):
+    """Write `columns` (name -> 1-d array, equal lengths) to `directory` as .npy
+    files plus a JSON manifest holding `fields`. Returns the manifest.
+
+    Column files carry a unique tag (also the manifest 'version') and are
+    fsynced before the manifest and then the version sidecar are atomically
+    replaced, so a reader always sees a complete set. Files older than the
+    previous version are removed afterwards; files still mapped by a reader
+    are kept until a later write.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with _write_lock(directory):
+        previous = read_manifest(directory)
+        tag = str(time.time_ns())
+        files = {}
+        for name, array in columns.items():
+            files[name] = f"{len(files)}.{tag}.npy"
+            with open(os.path.join(directory, files[name]), 'wb') as f:
+                np.save(f, np.asarray(array), allow_pickle=False)
+                f.flush()
+                os.fsync(f.fileno())
+
+        manifest = {
+            'format': COLUMNAR_FORMAT,
+            'version': tag,
+            'saved_at': time.time(),
+            'count': len(next(iter(columns.values()))) if columns else 0,
+            'columns': files,
+        }
+        manifest.update(fields)
+        atomic_write(os.path.join(directory, MANIFEST_FILE), json.dumps(manifest).encode('utf-8'))
+        atomic_write(os.path.join(directory, VERSION_FILE), tag.encode('utf-8'))
+
+        # keep the previous version for readers that picked up its manifest just before the swap
+        keep = set(files.values()) | set((previous or {}).get('columns', {}).values())
+        for name in os.listdir(directory):
+            if name.endswith('.npy') and name not in keep:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+        return manifest
+
+
+def read_columns(directory, mmap=True):
+    """Load the columns written by `write_columns`, memory-mapped read-only.
+    Returns (columns, manifest), or (None, None) when nothing usable is stored.
+    The manifest is re-read when a concurrent write removed its files.
+    """
+    for _ in range(READ_ATTEMPTS):
+        manifest = read_manifest(directory)
+        if manifest is None:
+            return None, None
+        # an empty file cannot be memory-mapped
+        mmap_mode = 'r' if mmap and manifest['count'] else None
+        try:
+            columns = {
+                name: np.load(os.path.join(directory, fname), mmap_mode=mmap_mode, allow_pickle=False)
+                for name, fname in manifest['columns'].items()
+            }
+        except (OSError, ValueError, KeyError):
+            continue
+        if all(len(array) == manifest['count'] for array in columns.values()):
+            return columns, manifest
+    return None, None
+
+
+def _column_array(series):
+    """Typed array for a DataFrame column: numbers, booleans and datetimes keep
+    their dtype, everything else is stored as fixed-width unicode ('' for
+    missing values).
+    """
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype) and not series.isna().any():
+        return series.to_numpy(dtype=bool)
+    if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+        if pd.api.types.is_extension_array_dtype(dtype):
+            return series.to_numpy(dtype=np.float64, na_value=np.nan)
+        return series.to_numpy()
+    if pd.api.types.is_datetime64_dtype(dtype):
+        return series.to_numpy()
+    return series.astype(object).where(series.notna(), '').astype(str).to_numpy(dtype=str)
+
+
+def frame_to_columns(df):
+    """Split a DataFrame into typed column arrays for `write_columns`."""
+    return {str(name): _column_array(df[name]) for name in df.columns}
+
+
+def columns_to_frame(columns):
+    """Build a DataFrame from column arrays.
+
+    Number and boolean columns wrap their arrays (memory-mapped ones too)
+    without a copy: `copy=False` keeps pandas from consolidating them into one
+    block, and pandas refuses in-place writes to the shared read-only memory.
+    Text columns are copied into str objects, since pandas has no fixed-width
+    unicode dtype; they cost a copy on every load.
+    """
+    data = {name: array.astype(object) if array.dtype.kind == 'U' else array for name, array in columns.items()}
+    return pd.DataFrame(data, copy=False)
+
+
+def _concat(chunks):
+    """Join a column's chunks. Integer chunks stand for runs of missing values,
+    filled with NaN (numbers), NaT (datetimes) or '' (text); a column whose
+    batches disagree on the type is stored as text.
+    """
+    arrays = [chunk for chunk in chunks if not isinstance(chunk, int)]
+    kinds = {array.dtype.kind for array in arrays}
+    if kinds <= set('biuf'):
+        fill = np.nan
+    elif kinds == {'M'}:
+        fill = np.datetime64('NaT')
+    else:
+        fill = ''
+        if kinds != {'U'}:
+            arrays = [_column_array(pd.Series(array, dtype=object)) for array in arrays]
+    parts, arrays = [], iter(arrays)
+    for chunk in chunks:
+        parts.append(np.full(chunk, fill) if isinstance(chunk, int) else next(arrays))
+    return np.concatenate(parts)
+
+
+class ColumnSink:
+    """Accumulate batches of records (lists of dicts) as typed column chunks.
+
+    Each batch is converted to arrays as it arrives, so a large enumeration
+    holds one array chunk per column and batch instead of one dict per
+    record. `columns()` joins the chunks for `write_columns`; `frame()`
+    builds the DataFrame.
+    """
+
+    def __init__(self):
+        self._chunks = {}
+        self.count = 0
+
+    def append(self, records):
+        if not records:
+            return
+        batch = pd.DataFrame.from_records(records)
+        batch.columns = [str(name) for name in batch.columns]
+        for name in batch.columns:
+            # a column first seen in this batch is missing from the earlier rows
+            self._chunks.setdefault(name, [self.count] if self.count else [])
+        for name, chunks in self._chunks.items():
+            column = batch[name] if name in batch.columns else None
+            if column is None or column.isna().all():
+                chunks.append(len(batch))
+            else:
+                chunks.append(_column_array(column))
+        self.count += len(batch)
+
+    def __len__(self):
+        return self.count
+
+    def columns(self):
+        return {name: _concat(chunks) for name, chunks in self._chunks.items()}
+
+    def frame(self):
+        return columns_to_frame(self.columns())
@@ -0,0 +1,267 @@
+import threading
+import numpy as np
+import pandas as pd
+from positions_store import INITIAL_CAPACITY, LOGIN, PROFIT, SYMBOL, TYPE, VOLUME
+
+__all__ = ['RunningExposure', 'compute_exposure', 'get_exposure', 'get_totals', 'publish_exposure',
+           'symbol_exposure']
+
+EXPOSURE_COLUMNS = ['login', 'symbol', 'net_lot', 'gross_lot', 'pnl', 'count']
+
+_latest = {}
+_lock = threading.Lock()
+
+
+def _row_delta(record):
+    """Return (login as int, symbol, net_lot, gross_lot, pnl) for a store
+    record, or None for records without a symbol.
+    """
+    symbol = record[SYMBOL]
+    if not symbol:
+        return None
+    try:
+        volume = float(record[VOLUME] or 0)
+    except (TypeError, ValueError):
+        volume = 0.0
+    try:
+        pnl = float(record[PROFIT] or 0)
+    except (TypeError, ValueError):
+        pnl = 0.0
+    order_type = record[TYPE]
+    is_sell = order_type == 1 or (isinstance(order_type, str) and order_type.strip().lower().startswith('s'))
+    return int(record[LOGIN]), symbol, -volume if is_sell else volume, volume, pnl
+
+
+class _ExposureCopy:
+    """Compacted copy of a RunningExposure taken by `RunningExposure.copy()`."""
+
+    def __init__(self, login, symbol_codes, symbols, values, count, totals):
+        self._login = login
+        self._symbol_codes = symbol_codes
+        self._symbols = symbols
+        self._values = values
+        self._count = count
+        self._totals = totals
+
+    def frame(self):
+        """Return the cells in the `compute_exposure` layout."""
+        if not len(self._login):
+            return pd.DataFrame(columns=EXPOSURE_COLUMNS)
+        return pd.DataFrame({
+            'login': self._login.astype(str).astype(object),
+            'symbol': np.asarray(self._symbols, dtype=object)[self._symbol_codes],
+            'net_lot': self._values[:, 0],
+            'gross_lot': self._values[:, 1],
+            'pnl': self._values[:, 2],
+            'count': self._count,
+        })
+
+    def totals(self):
+        """Return the 'All Login' totals per symbol (index symbol, columns
+        net_lot, gross_lot, pnl, count).
+        """
+        return pd.DataFrame.from_dict(self._totals, orient='index', columns=EXPOSURE_COLUMNS[2:])
+
+
+class RunningExposure:
+    """Per (login, symbol) exposure kept up to date from PositionsStore deltas.
+
+    Register it with `PositionsStore.add_listener`: every open, close or
+    modification adjusts only the affected cell and that symbol's 'All Login'
+    totals, so the aggregate is ready without a recompute. Cells live in
+    typed arrays (a float64 row of net, gross and pnl plus an int64 count)
+    indexed per symbol by login. Cells whose last position closes are
+    dropped, which also discards float drift.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self, capacity=INITIAL_CAPACITY):
+        self._slots = {}
+        self._login = np.zeros(capacity, np.int64)
+        self._symbol_codes = np.zeros(capacity, np.int32)
+        self._values = np.zeros((capacity, 3))
+        self._count = np.zeros(capacity, np.int64)
+        self._size = 0
+        self._free = []
+        self._symbols = []
+        self._codes = {}
+        self._totals = {}
+
+    def _slot(self, login, symbol):
+        by_login = self._slots.get(symbol)
+        if by_login is None:
+            by_login = self._slots[symbol] = {}
+            self._codes[symbol] = len(self._symbols)
+            self._symbols.append(symbol)
+        slot = by_login.get(login)
+        if slot is not None:
+            return slot
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._size == len(self._count):
+                capacity = 2 * self._size
+                for name in ('_login', '_symbol_codes', '_values', '_count'):
+                    array = getattr(self, name)
+                    grown = np.zeros((capacity,) + array.shape[1:], array.dtype)
+                    grown[:self._size] = array
+                    setattr(self, name, grown)
+            slot = self._size
+            self._size += 1
+        by_login[login] = slot
+        self._login[slot] = login
+        self._symbol_codes[slot] = self._codes[symbol]
+        self._values[slot] = 0.0
+        self._count[slot] = 0
+        return slot
+
+    def _add(self, login, symbol, net_lot, gross_lot, pnl, sign):
+        slot = self._slot(login, symbol)
+        values = self._values[slot]
+        values[0] += sign * net_lot
+        values[1] += sign * gross_lot
+        values[2] += sign * pnl
+        self._count[slot] += sign
+        if self._count[slot] <= 0:
+            self._count[slot] = 0
+            del self._slots[symbol][login]
+            self._free.append(slot)
+
+        total = self._totals.get(symbol)
+        if total is None:
+            total = self._totals[symbol] = [0.0, 0.0, 0.0, 0]
+        total[0] += sign * net_lot
+        total[1] += sign * gross_lot
+        total[2] += sign * pnl
+        total[3] += sign
+        if total[3] <= 0:
+            del self._totals[symbol]
+
+    def apply(self, old, new):
+        with self._lock:
+            for record, sign in ((old, -1), (new, 1)):
+                delta = record and _row_delta(record)
+                if delta:
+                    self._add(*delta, sign)
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def copy(self):
+        """Return a compacted copy of the cells and totals with the same
+        `frame()` and `totals()` methods. Only the arrays are copied, so it is
+        cheap enough to take under the store lock and build frames outside it.
+        """
+        with self._lock:
+            live = np.flatnonzero(self._count[:self._size] > 0)
+            return _ExposureCopy(self._login[live], self._symbol_codes[live], tuple(self._symbols),
+                                 self._values[live], self._count[live],
+                                 {symbol: list(total) for symbol, total in self._totals.items()})
+
+    def frame(self):
+        """Return the cells in the `compute_exposure` layout."""
+        return self.copy().frame()
+
+    def totals(self):
+        """Return the 'All Login' totals per symbol (index symbol, columns
+        net_lot, gross_lot, pnl, count).
+        """
+        return self.copy().totals()
+
+
+def compute_exposure(snapshot):
+    """Aggregate a PositionsSnapshot per (login, symbol) in one vectorized pass.
+
+    Returns a long DataFrame with columns login (str), symbol (str), net_lot
+    (buy minus sell volume), gross_lot (buy plus sell volume), pnl (sum of
+    position profit) and count (open positions).
+    """
+    if snapshot is None or not len(snapshot):
+        return pd.DataFrame(columns=EXPOSURE_COLUMNS)
+
+    frame = pd.DataFrame({
+        'login': snapshot.login,
+        'symbol': snapshot.symbol_codes,
+        'net_lot': snapshot.volume * snapshot.side,
+        'gross_lot': snapshot.volume,
+        'pnl': snapshot.profit,
+    })
+    if '' in snapshot.symbols:
+        frame = frame[frame['symbol'] != snapshot.symbols.index('')]
+
+    agg = frame.groupby(['login', 'symbol'], sort=False).agg(
+        net_lot=('net_lot', 'sum'),
+        gross_lot=('gross_lot', 'sum'),
+        pnl=('pnl', 'sum'),
+        count=('pnl', 'size'),
+    ).reset_index()
+    agg['login'] = agg['login'].astype(str)
+    agg['symbol'] = np.asarray(snapshot.symbols, dtype=object)[agg['symbol'].to_numpy()] if len(agg) else agg['symbol'].astype(object)
+    return agg[EXPOSURE_COLUMNS]
+
+
+def publish_exposure(snapshot, running):
+    """Record the running aggregate as the exposure of `snapshot`. `running` is
+    a RunningExposure or a copy of one taken under the same store lock as the
+    snapshot's columns, so both describe the same store version.
+    """
+    frame, totals = running.frame(), running.totals()
+    with _lock:
+        _latest.clear()
+        _latest[snapshot.cache_key] = (frame, totals)
+
+
+def get_exposure(snapshot):
+    """Return the exposure of `snapshot`: the published running aggregate, or
+    `compute_exposure(snapshot)` computed once per snapshot. Shared by every
+    view; treat the result as read-only. Only the latest snapshot is kept, so
+    a snapshot without a cache key is computed without replacing it.
+    """
+    key = snapshot.cache_key
+    if key is None:
+        return compute_exposure(snapshot)
+    with _lock:
+        cached = _latest.get(key)
+    if cached is not None:
+        return cached[0]
+    result = compute_exposure(snapshot)
+    with _lock:
+        _latest.clear()
+        _latest[key] = (result, None)
+    return result
+
+
+def get_totals(snapshot):
+    """Return the maintained 'All Login' totals for `snapshot`, or None when
+    its exposure was not published from a running aggregate.
+    """
+    key = snapshot.cache_key
+    if key is None:
+        return None
+    with _lock:
+        cached = _latest.get(key)
+    return cached[1] if cached is not None else None
+
+
+def _restrict(exposure, logins):
+    if logins is None:
+        return exposure
+    return exposure[exposure['login'].isin(set(str(login) for login in logins))]
+
+
+def symbol_exposure(exposure, logins=None, totals=None):
+    """Sum exposure per symbol across logins. Returns columns symbol, net_lot,
+    gross_lot, pnl, count. Maintained `totals` are used when no login is
+    filtered out.
+    """
+    restricted = _restrict(exposure, logins)
+    if totals is not None and len(restricted) == len(exposure):
+        return totals.rename_axis('symbol').reset_index()
+    exposure = restricted
+    if exposure.empty:
+        return pd.DataFrame(columns=['symbol', 'net_lot', 'gross_lot', 'pnl', 'count'])
+    return exposure.groupby('symbol', as_index=False)[['net_lot', 'gross_lot', 'pnl', 'count']].sum()
@@ -0,0 +1,164 @@
+import threading
+import time
+from MT5Service import _account_state, _position_to_dict
+
+__all__ = ['LiveBook']
+
+
+def _user_meta(user):
+    """Extract account metadata (name, email, group) from an MT5 user object."""
+    return {
+        'Name': getattr(user, 'Name', None) or f"{getattr(user, 'FirstName', '')} {getattr(user, 'LastName', '')}".strip(),
+        'Email': getattr(user, 'EMail', None),
+        'Group': getattr(user, 'Group', None),
+        'Leverage': getattr(user, 'Leverage', None),
+    }
+
+
+class _PositionSink:
+    """Manager API position sink forwarding pump notifications to a LiveBook."""
+
+    def __init__(self, book):
+        self.book = book
+
+    def OnPositionAdd(self, position):
+        self.book.apply_position(position)
+
+    def OnPositionUpdate(self, position):
+        self.book.apply_position(position)
+
+    def OnPositionDelete(self, position):
+        self.book.remove_position(getattr(position, 'Position', None))
+
+
+class _UserSink:
+    """Manager API user sink keeping account metadata and groups current."""
+
+    def __init__(self, book):
+        self.book = book
+
+    def OnUserAdd(self, user):
+        self.book.apply_user(user)
+
+    def OnUserUpdate(self, user):
+        self.book.apply_user(user)
+
+    def OnUserDelete(self, user):
+        self.book.remove_user(getattr(user, 'Login', None))
+
+
+class _AccountSink:
+    """Manager API account sink keeping balance/equity/margin/profit current."""
+
+    def __init__(self, book):
+        self.book = book
+
+    def OnAccountUpdate(self, account):
+        self.book.apply_account(account)
+
+    # some Manager API builds use the longer callback name
+    OnUserAccountUpdate = OnAccountUpdate
+
+
+class LiveBook:
+    """Applies MT5 pump notifications to a shared PositionsStore.
+
+    Position add/update/delete notifications become O(1) store updates, user
+    notifications keep the latest metadata per login in `users` and account
+    notifications keep the latest balance/equity/margin/profit per login in
+    `accounts`. Rows are built with `make_row(login, position_dict)` so they
+    match the scanner cache format. Logins touched by user or account
+    notifications are collected until `drain_account_changes` is called.
+    """
+
+    def __init__(self, store, make_row):
+        self.store = store
+        self.make_row = make_row
+        self._lock = threading.Lock()
+        self.accounts = {}
+        self.users = {}
+        self.updated_at = 0
+        self._sinks = {}
+        # MT5Service.connection_generation() the sinks were registered on
+        self.generation = None
+        self._changed = set()
+        self._removed = set()
+
+    def apply_position(self, position):
+        p = _position_to_dict(position)
+        login = str(p.get('login'))
+        self.store.upsert(self.make_row(login, p))
+        self.updated_at = time.time()
+
+    def remove_position(self, ticket):
+        if ticket is None:
+            return
+        self.store.remove(ticket)
+        self.updated_at = time.time()
+
+    def apply_user(self, user):
+        login = str(getattr(user, 'Login', None))
+        meta = _user_meta(user)
+        with self._lock:
+            self.users[login] = meta
+            self._changed.add(login)
+            self._removed.discard(login)
+        self.updated_at = time.time()
+
+    def remove_user(self, login):
+        if login is None:
+            return
+        login = str(login)
+        with self._lock:
+            self.users.pop(login, None)
+            self.accounts.pop(login, None)
+            self._changed.discard(login)
+            self._removed.add(login)
+        self.store.replace_login(login, [])
+        self.updated_at = time.time()
+
+    def apply_account(self, account):
+        login = str(getattr(account, 'Login', None))
+        with self._lock:
+            self.accounts[login] = _account_state(account)
+            self._changed.add(login)
+        self.updated_at = time.time()
+
+    def drain_account_changes(self):
+        """Return (changed, removed) login sets collected from user and account
+        notifications since the previous call, and reset them.
+        """
+        with self._lock:
+            changed, removed = self._changed, self._removed
+            self._changed, self._removed = set(), set()
+        return changed, removed
+
+    def subscribe(self, svc):
+        """Register the position, user and account sinks with `svc`.
+        Returns True when at least the position sink was accepted.
+        """
+        svc.connect()
+        self.generation = svc.connection_generation()
+        sinks = {'position': _PositionSink(self), 'user': _UserSink(self), 'account': _AccountSink(self)}
+        for kind, sink in sinks.items():
+            if svc.subscribe(kind, sink):
+                self._sinks[kind] = sink
+        return 'position' in self._sinks
+
+    def unsubscribe(self, svc):
+        for kind, sink in list(self._sinks.items()):
+            svc.unsubscribe(kind, sink)
+            del self._sinks[kind]
+
+    @property
+    def subscribed(self):
+        return 'position' in self._sinks
+
+    def is_current(self, svc):
+        """False once `svc` has reconnected since the sinks were registered."""
+        return self.generation == svc.connection_generation()
+
+    @property
+    def tracks_accounts(self):
+        """True when both user and account notifications are subscribed."""
+        return 'user' in self._sinks and 'account' in self._sinks
@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+from columnar_store import atomic_write
+
+__all__ = ['LoginRangeMap']
+
+# Logins closer than this are kept in the same band
+BAND_GAP = 100
+# Logins probed on each side of a band, so accounts opened next to it are found
+BAND_MARGIN = 200
+# A sweep samples every SWEEP_STRIDE-th login outside the bands to find new ones
+SWEEP_STRIDE = 50
+SWEEP_INTERVAL = 24 * 3600
+
+_file_lock = threading.Lock()
+
+
+def _bands(logins, gap=BAND_GAP):
+    """Merge sorted login numbers into [first, last] bands."""
+    bands = []
+    for login in sorted(set(logins)):
+        if bands and login - bands[-1][1] <= gap:
+            bands[-1][1] = login
+        else:
+            bands.append([login, login])
+    return bands
+
+
+def _merge(ranges):
+    """Merge overlapping or adjacent [first, last] ranges."""
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
+
+
+class LoginRangeMap:
+    """Occupied login bands of one MT5 server, persisted in a JSON file keyed
+    by server address.
+
+    Bands are learned from complete enumerations (by group or a full range
+    scan). A range scan then probes only the bands widened by BAND_MARGIN,
+    plus every SWEEP_STRIDE-th login elsewhere once per SWEEP_INTERVAL, so a
+    fallback scan costs a few thousand probes instead of one per login.
+    """
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = str(key)
+        self._lock = threading.Lock()
+        self.bands = []
+        self.swept_at = 0
+        self.updated_at = 0
+        entry = self._read().get(self.key) or {}
+        try:
+            self.bands = _merge([int(first), int(last)] for first, last in entry.get('bands', []))
+            self.swept_at = float(entry.get('swept_at', 0))
+            self.updated_at = float(entry.get('updated_at', 0))
+        except (TypeError, ValueError):
+            self.bands = []
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def save(self):
+        with _file_lock:
+            data = self._read()
+            with self._lock:
+                data[self.key] = {'bands': self.bands, 'swept_at': self.swept_at, 'updated_at': self.updated_at}
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                atomic_write(self.path, json.dumps(data).encode('utf-8'))
+            except OSError as e:
+                print(f"Error saving login ranges: {e}")
+
+    def __bool__(self):
+        return bool(self.bands)
+
+    def sweep_due(self, now=None):
+        return (now or time.time()) - self.swept_at >= SWEEP_INTERVAL
+
+    def probe_ranges(self, start, end, margin=BAND_MARGIN):
+        """[first, last] ranges within start..end covering every band +- `margin`."""
+        ranges = [[max(start, first - margin), min(end, last + margin)] for first, last in self.bands]
+        return _merge(r for r in ranges if r[0] <= r[1])
+
+    def sweep_points(self, start, end, stride=SWEEP_STRIDE, margin=BAND_MARGIN):
+        """Every `stride`-th login of start..end that lies outside `probe_ranges`."""
+        covered = self.probe_ranges(start, end, margin)
+        points, index = [], 0
+        for login in range(start, end + 1, stride):
+            while index < len(covered) and covered[index][1] < login:
+                index += 1
+            if index < len(covered) and covered[index][0] <= login:
+                continue
+            points.append(login)
+        return points
+
+    def record(self, logins, complete=False, swept=False):
+        """Learn bands from found `logins`. With `complete` (the enumeration saw
+        every account) the bands are replaced, otherwise they are extended.
+        """
+        numbers = []
+        for login in logins:
+            try:
+                numbers.append(int(login))
+            except (TypeError, ValueError):
+                continue
+        if not numbers and not complete:
+            return
+        with self._lock:
+            found = _bands(numbers)
+            self.bands = found if complete else _merge(self.bands + found)
+            self.updated_at = time.time()
+            if swept:
+                self.swept_at = self.updated_at
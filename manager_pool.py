@@ -0,0 +1,118 @@
+import threading
+import time
+from contextlib import contextmanager
+
+__all__ = ['ManagerPool']
+
+
+class ManagerPool:
+    """Fixed-size pool of independent MT5 Manager connections.
+
+    `factory(slot)` returns a connected ManagerAPI for pool slot `slot`;
+    connections are opened lazily, at most `size` at a time. `checkout()`
+    lends one connection to a single thread, so N threads read in parallel
+    instead of queueing on one session. A connection that reports itself
+    disconnected, fails the optional `check(manager)` on checkout, or whose
+    checkout ended with an exception, is dropped and its slot reconnects on
+    next use. `health()` reports per-slot counters.
+    """
+
+    def __init__(self, factory, size, check=None):
+        self._factory = factory
+        self._check = check
+        self.size = max(1, int(size))
+        self._cond = threading.Condition()
+        self._idle = []
+        self._unused = list(range(self.size - 1, -1, -1))
+        self._health = {slot: {'connected': False, 'uses': 0, 'failures': 0, 'connected_at': None,
+                               'last_used': None, 'last_error': None} for slot in range(self.size)}
+
+    def acquire(self, timeout=None):
+        """Return (slot, manager), waiting up to `timeout` seconds (forever when
+        None) for a free connection. Raises TimeoutError when none frees up.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._idle and not self._unused:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError('No MT5 Manager connection available')
+                self._cond.wait(remaining)
+            slot, mgr = self._idle.pop() if self._idle else (self._unused.pop(), None)
+
+        if mgr is not None and self._check is not None and not self._check(mgr):
+            _disconnect(mgr)
+            with self._cond:
+                self._health[slot]['failures'] += 1
+            mgr = None
+        if mgr is None or not getattr(mgr, 'connected', True):
+            try:
+                mgr = self._factory(slot)
+            except Exception as e:
+                with self._cond:
+                    self._health[slot].update(connected=False, last_error=str(e))
+                    self._health[slot]['failures'] += 1
+                    self._unused.append(slot)
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._health[slot].update(connected=True, connected_at=time.time(), last_error=None)
+        with self._cond:
+            self._health[slot]['uses'] += 1
+            self._health[slot]['last_used'] = time.time()
+        return slot, mgr
+
+    def release(self, slot, mgr, healthy=True):
+        """Return a connection from `acquire`; unhealthy ones are disconnected."""
+        healthy = healthy and getattr(mgr, 'connected', True)
+        if not healthy:
+            _disconnect(mgr)
+        with self._cond:
+            if healthy:
+                self._idle.append((slot, mgr))
+            else:
+                self._health[slot]['connected'] = False
+                self._health[slot]['failures'] += 1
+                self._unused.append(slot)
+            self._cond.notify()
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Lend a connection for the duration of the `with` block."""
+        slot, mgr = self.acquire(timeout)
+        healthy = True
+        try:
+            yield mgr
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            self.release(slot, mgr, healthy)
+
+    def health(self):
+        """{slot: {'connected', 'uses', 'failures', 'connected_at', 'last_used', 'last_error'}}"""
+        with self._cond:
+            return {slot: dict(state) for slot, state in self._health.items()}
+
+    def close(self):
+        """Disconnect the idle connections; their slots reconnect on next checkout."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            for slot, _ in idle:
+                self._health[slot]['connected'] = False
+                self._unused.append(slot)
+        for _, mgr in idle:
+            _disconnect(mgr)
+
+
+def _disconnect(mgr):
+    try:
+        disconnect = getattr(mgr, 'Disconnect', None)
+        if disconnect is not None:
+            disconnect()
+    except Exception:
+        pass
+    try:
+        mgr.connected = False
+    except Exception:
+        pass
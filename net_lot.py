@@ -2,6 +2,9 @@ import pandas as pd
 import streamlit as st
 import io
 from MT5Service import MT5Service
+from aggregation_cache import cached_aggregation
+from positions_snapshot import snapshot_for
+from exposure import get_exposure, get_totals, symbol_exposure
 from Matrix_lot import get_login_symbol_matrix
 from pnl_matrix import get_login_symbol_pnl_from_open_positions
 import logging
@@ -13,7 +16,7 @@ logger = logging.getLogger(__name__)
 __all__ = ['get_symbol_net_lot_pnl', 'display_net_lot_view']
 
 
-@st.cache_data(ttl=5)
+@cached_aggregation   # keyed on positions snapshot + accounts version
 def get_symbol_net_lot_pnl(accounts_df=None, positions_cache=None):
     """
     Aggregate net lots and USD P&L per symbol across all logins.
@@ -22,7 +25,17 @@ def get_symbol_net_lot_pnl(accounts_df=None, positions_cache=None):
     """
     logger.info("🔄 LOADING SYMBOL NET LOT AND P&L DATA")
 
-    # Get net lot matrix (login x symbol)
+    # Scanner snapshot: per-symbol totals straight from the shared exposure aggregate
+    snapshot = snapshot_for(positions_cache) if positions_cache is not None else None
+    if snapshot is not None and len(snapshot):
+        logins = accounts_df['login'] if accounts_df is not None and not accounts_df.empty else None
+        df = symbol_exposure(get_exposure(snapshot), logins, get_totals(snapshot))[['symbol', 'net_lot', 'pnl']]
+        df = df.rename(columns={'pnl': 'usd_pnl'}).round({'net_lot': 2, 'usd_pnl': 2})
+        df = df.sort_values('net_lot', key=lambda s: s.abs(), ascending=False, ignore_index=True)
+        logger.info(f"✅ SYMBOL NET LOT DATA LOADED: {len(df)} symbols")
+        return df
+
+    # Fallback: build the net lot and P&L matrices (login x symbol)
     net_lot_matrix = get_login_symbol_matrix(accounts_df, positions_cache)
 
     # Get P&L matrix (login x symbol)
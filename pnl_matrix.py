@@ -1,7 +1,10 @@
 # pnl_matrix.py
-import pandas as pd
 import streamlit as st
 from MT5Service import MT5Service
+from positions_snapshot import snapshot_for
+from aggregation_cache import cached_aggregation
+from exposure import get_exposure, get_totals
+from sparse_matrix import SparseMatrix, display_sparse_matrix
 import logging
 
 logging.basicConfig(level=logging.INFO,
@@ -20,48 +23,25 @@ def _safe_float(value):
         return 0.0
 
 
-def _get_positions_list(positions_cache):
-    """Extract positions list from cache or session state."""
+def _get_positions_snapshot(positions_cache):
+    """Return the scanner's positions snapshot from the cache or session state."""
     if positions_cache is None:
         try:
             positions_cache = st.session_state.get("positions_cache")
         except Exception:
             return None
-
-    if not positions_cache:
+    if positions_cache is None:
         return None
 
-    if isinstance(positions_cache, dict) and "data" in positions_cache:
-        return positions_cache.get("data") or None
-    elif isinstance(positions_cache, list):
-        return positions_cache if positions_cache else None
-
-    return None
-
-
-def _build_final_matrix(matrix):
-    """Convert matrix dict to DataFrame with 'All Login' row."""
-    if not matrix:
-        return pd.DataFrame()
-
-    df = pd.DataFrame.from_dict(matrix, orient="index").fillna(0.0)
-
-    if df.empty or len(df.columns) == 0:
-        return df
-
-    df.loc["All Login"] = df.sum()
-    df = df[sorted(df.columns)]
-    df = df.reindex(["All Login"] + [i for i in df.index if i != "All Login"])
-
-    return df
+    snapshot = snapshot_for(positions_cache)
+    return snapshot if len(snapshot) else None
 
 
 # ===========================
 #  UNIFIED MATRIX FUNCTIONS
 # ===========================
-@st.cache_data(ttl=5)
 def get_login_symbol_pnl_matrix(data):
-    """Wrapper for getting PNL matrix from open positions."""
+    """Wrapper for getting PNL matrix from open positions (cached by the wrapped function)."""
     return get_login_symbol_pnl_from_open_positions(
         accounts_df=data.get("accounts_df"),
         positions_cache=data.get("positions_cache")
@@ -71,14 +51,14 @@ def get_login_symbol_pnl_matrix(data):
 # ===========================
 #  PNL FROM OPEN POSITIONS
 # ===========================
-@st.cache_data(ttl=5)
-def get_login_symbol_pnl_from_open_positions(accounts_df=None, positions_cache=None):
+@cached_aggregation   # keyed on positions snapshot + accounts version
+def get_login_symbol_pnl_sparse(accounts_df=None, positions_cache=None):
     """
     Compute USD unrealized P&L per Login vs Symbol using open positions.
 
-    ✔ Uses cached scanner data (positions_cache)
+    ✔ Uses the shared exposure aggregate of the scanner snapshot
     ✔ Falls back to MT5Service.get_open_positions(login)
-    ✔ Returns final matrix with “All Login”
+    ✔ Returns a SparseMatrix (only non-empty cells) with “All Login” totals
     """
     svc = MT5Service()
 
@@ -91,144 +71,56 @@ def get_login_symbol_pnl_from_open_positions(accounts_df=None, positions_cache=N
         try:
             accounts = svc.list_accounts_by_groups()
             if not accounts:
-                return pd.DataFrame()
+                return SparseMatrix.from_dict({})
             logins = [str(acc.get("Login") or acc.get("login")) for acc in accounts]
         except Exception:
-            return pd.DataFrame()
+            return SparseMatrix.from_dict({})
 
     # -----------------------------------
-    # 2. NORMALIZE SCANNER POSITIONS CACHE
+    # 2. SCANNER POSITIONS SNAPSHOT
     # -----------------------------------
-    positions_list = None
-
-    if positions_cache is None:
-        positions_cache = st.session_state.get("positions_cache", None)
-
-    if positions_cache:
-        if isinstance(positions_cache, dict) and "data" in positions_cache:
-            positions_list = positions_cache.get("data") or []
-        elif isinstance(positions_cache, list):
-            positions_list = positions_cache
+    snapshot = _get_positions_snapshot(positions_cache)
+    if snapshot is not None:
+        return SparseMatrix.from_exposure(get_exposure(snapshot), 'pnl', logins, get_totals(snapshot))
 
     matrix = {}
 
     # -----------------------------------
-    # 3. FOR EACH LOGIN BUILD SYMBOL PNL
+    # 3. FALLBACK: PER-LOGIN MT5 API CALL
     # -----------------------------------
     for login in logins:
         symbol_pnl = {}
 
-        # ------------------------------
-        # USE SCANNER CACHE
-        # ------------------------------
-        if positions_list:
-            for p in positions_list:
-                p_login = str(p.get("Login") or p.get("login") or "")
-                if p_login != str(login):
-                    continue
-
-                symbol = p.get("Symbol") or p.get("symbol")
-                profit = p.get("P/L") or p.get("profit") or p.get("Profit") or p.get("pl") or 0
-
-                try:
-                    profit = float(profit)
-                except:
-                    profit = 0.0
-
-                if symbol:
-                    symbol_pnl[symbol] = symbol_pnl.get(symbol, 0.0) + profit
-
-        # ------------------------------
-        # FALLBACK: PER-LOGIN MT5 API CALL
-        # ------------------------------
-        else:
-            try:
-                positions = svc.get_open_positions(login)
-            except Exception:
-                positions = []
-
-            for p in positions or []:
-                symbol = p.get("symbol") or p.get("Symbol")
-                profit = p.get("profit") or p.get("Profit") or p.get("pl") or 0
-
-                try:
-                    profit = float(profit)
-                except:
-                    profit = 0.0
-
-                if symbol:
-                    symbol_pnl[symbol] = symbol_pnl.get(symbol, 0.0) + profit
+        try:
+            positions = svc.get_open_positions(login)
+        except Exception:
+            positions = []
+
+        for p in positions or []:
+            symbol = p.get("symbol") or p.get("Symbol")
+            if symbol:
+                profit = _safe_float(p.get("profit") or p.get("Profit") or p.get("pl") or 0)
+                symbol_pnl[symbol] = symbol_pnl.get(symbol, 0.0) + profit
 
         matrix[str(login)] = symbol_pnl
 
     # -----------------------------------
-    # 4. BUILD FINAL PIVOT DF
+    # 4. BUILD SPARSE PIVOT
     # -----------------------------------
-    df = pd.DataFrame.from_dict(matrix, orient="index").fillna(0.0)
+    return SparseMatrix.from_dict(matrix)
 
-    if not df.empty:
-        df.loc["All Login"] = df.sum()
-        df = df[sorted(df.columns)]
-        df = df.reindex(["All Login"] + [i for i in df.index if i != "All Login"])
 
-    return df
+def get_login_symbol_pnl_from_open_positions(accounts_df=None, positions_cache=None):
+    """Dense Login x Symbol USD P&L DataFrame with the “All Login” row on top."""
+    return get_login_symbol_pnl_sparse(accounts_df, positions_cache).to_frame()
 
 
 # ===========================
 #  PROFIT/LOSS MATRIX FUNCTION
 # ===========================
-@st.cache_data(ttl=5)
 def get_login_symbol_profit_matrix(accounts_df=None, positions_cache=None):
     """Get Login vs Symbol matrix with PROFIT/LOSS values from open positions."""
-    svc = MT5Service()
-
-    if accounts_df is not None and not accounts_df.empty:
-        logins = accounts_df['login'].astype(str).unique()
-    else:
-        try:
-            accounts = svc.list_accounts_by_groups()
-            if not accounts:
-                return pd.DataFrame()
-            logins = [str(acc["login"]) for acc in accounts]
-        except Exception:
-            return pd.DataFrame()
-
-    positions_list = _get_positions_list(positions_cache)
-    matrix = {}
-
-    for login in logins:
-        symbol_pnl = {}
-        login_str = str(login)
-
-        if positions_list:
-            for p in positions_list:
-                p_login = str(p.get('Login') or p.get('login') or '')
-                if p_login != login_str:
-                    continue
-
-                symbol = p.get('Symbol') or p.get('symbol')
-                if not symbol:
-                    continue
-
-                profit = _safe_float(p.get('P/L') or p.get('profit') or p.get('Profit') or p.get('pl') or 0)
-                symbol_pnl[symbol] = symbol_pnl.get(symbol, 0.0) + profit
-
-        else:
-            try:
-                positions = svc.get_open_positions(login_str)
-                for p in positions or []:
-                    symbol = p.get('symbol') or p.get('Symbol')
-                    if not symbol:
-                        continue
-
-                    profit = _safe_float(p.get('profit') or p.get('Profit') or p.get('pl') or 0)
-                    symbol_pnl[symbol] = symbol_pnl.get(symbol, 0.0) + profit
-            except Exception:
-                pass
-
-        matrix[login_str] = symbol_pnl
-
-    return _build_final_matrix(matrix)
+    return get_login_symbol_pnl_from_open_positions(accounts_df, positions_cache)
 
 
 # ===========================
@@ -254,29 +146,28 @@ def display_login_symbol_pnl_pivot(accounts_df=None, positions_cache=None):
     """, unsafe_allow_html=True)
 
     try:
-        df = get_login_symbol_pnl_from_open_positions(accounts_df, positions_cache)
+        matrix = get_login_symbol_pnl_sparse(accounts_df, positions_cache)
 
-        if df.empty:
+        if matrix.empty:
             st.info("No P&L data available from open positions.")
             return
 
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Logins", len(df) - (1 if "All Login" in df.index else 0))
+            st.metric("Total Logins", len(matrix))
         with col2:
-            st.metric("Total Symbols", len(df.columns))
+            st.metric("Total Symbols", len(matrix.symbols))
         with col3:
-            total_pnl = df.loc["All Login"].sum()
+            total_pnl = matrix.total()
             st.metric("Total USD P&L (All Login)", f"${total_pnl:,.2f}")
 
-        display_df = df.copy().round(2)
-        st.dataframe(display_df, width="stretch", height=520)
+        display_df = display_sparse_matrix(matrix, key="pnl_pivot", height=520)
 
         logger.info("📋 FIRST 10 ROWS OF PNL PIVOT:")
         for idx, row_name in enumerate(display_df.index[:10]):
             logger.info(f"Row {idx+1} (Login={row_name}): {display_df.loc[row_name].to_dict()}")
 
-        csv = display_df.to_csv().encode("utf-8")
+        csv = matrix.to_csv().encode("utf-8")
         st.download_button(
             "📥 Download P&L Matrix CSV",
             data=csv,
@@ -317,45 +208,45 @@ def display_login_symbol_profit_pivot_table(accounts_df=None, positions_cache=No
     """, unsafe_allow_html=True)
     
     try:
-        # Get the profit matrix
-        matrix_df = get_login_symbol_profit_matrix(accounts_df, positions_cache)
+        # Get the profit matrix (sparse: only non-empty login x symbol cells)
+        matrix = get_login_symbol_pnl_sparse(accounts_df, positions_cache)
         
-        if matrix_df.empty:
+        if matrix.empty:
             st.warning("No data available to display profit/loss pivot table.")
             return
         
-        logger.info(f"Profit Matrix shape: {matrix_df.shape}")
-        logger.info(f"Logins (rows): {len(matrix_df) - 1} (plus All Login row)")
-        logger.info(f"Symbols (columns): {len(matrix_df.columns)}")
+        logger.info(f"Profit Matrix shape: {matrix.shape} ({matrix.nnz} non-empty cells)")
+        logger.info(f"Logins (rows): {len(matrix)} (plus All Login row)")
+        logger.info(f"Symbols (columns): {len(matrix.symbols)}")
         
         # Display metrics and views (Table + Single-Row)
+        totals = matrix.totals()
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("Total Logins", max(0, len(matrix_df) - (1 if 'All Login' in matrix_df.index else 0)))
+            st.metric("Total Logins", len(matrix))
         with col2:
-            st.metric("Total Symbols", len(matrix_df.columns))
+            st.metric("Total Symbols", len(matrix.symbols))
         with col3:
-            total_pnl = matrix_df.loc['All Login'].sum() if 'All Login' in matrix_df.index else matrix_df.sum().sum()
+            total_pnl = totals.sum()
             color = "inverse" if total_pnl < 0 else "off"
             st.metric("Total USD P&L (All Login)", f"${total_pnl:,.2f}", delta_color=color)
         with col4:
-            profitable_positions = (matrix_df.loc['All Login'] > 0).sum() if 'All Login' in matrix_df.index else (matrix_df.sum() > 0).sum()
+            profitable_positions = (totals > 0).sum()
             st.metric("Profitable Symbols", int(profitable_positions))
 
-        # Tabs: full table view and single-row (one-by-one) view
+        # Tabs: paged table view and single-row (one-by-one) view
         tab_table, tab_single = st.tabs(["📄 Table View", "🔎 Single Row View"])
 
-        # Table View: show full pivot
+        # Table View: densify only the visible page of the pivot
         with tab_table:
             st.write("**Profit/Loss Matrix (Login × Symbol):**")
-            display_df = matrix_df.copy().round(2)
-            st.dataframe(display_df, width='stretch', height=500)
+            display_df = display_sparse_matrix(matrix, key='profit_pivot')
 
         # Single Row View: navigate rows one-by-one similar to Matrix_lot.py
         with tab_single:
             st.write("**View one Login row at a time**")
 
-            rows = list(matrix_df.index)
+            rows = ['All Login'] + list(matrix.logins)
             if not rows:
                 st.info("No rows available to view.")
                 return
@@ -382,7 +273,7 @@ def display_login_symbol_profit_pivot_table(accounts_df=None, positions_cache=No
             st.session_state.pnl_current_row_idx = idx
 
             login_name = rows[idx]
-            record = matrix_df.loc[login_name]
+            record = matrix.row(login_name)
 
             st.write(f"**Record {idx + 1} of {len(rows)} — Login: {login_name}**")
 
@@ -412,14 +303,14 @@ def display_login_symbol_profit_pivot_table(accounts_df=None, positions_cache=No
         logger.info("")
         logger.info("FIRST 10 ROWS OF PROFIT/LOSS PIVOT TABLE:")
         logger.info("-" * 80)
-        for idx, row_name in enumerate(matrix_df.index[:10]):
-            row_data = matrix_df.loc[row_name]
+        for idx, row_name in enumerate(display_df.index[:10]):
+            row_data = display_df.loc[row_name]
             logger.info(f"Row {idx + 1} (Login={row_name}): {dict(row_data)}")
         logger.info("-" * 80)
         logger.info("")
         
-        # Export option (from full table)
-        csv = matrix_df.round(2).to_csv().encode('utf-8')
+        # Export option (full table, densified page by page)
+        csv = matrix.to_csv().encode('utf-8')
         st.download_button(
             label='📥 Download Profit/Loss Matrix as CSV',
             data=csv,
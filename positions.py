@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import time
 from MT5Service import MT5Service
+from positions_snapshot import snapshot_for
 
 def positions_view( data, positions_cache):
     # Auto-refresh every 5 seconds
@@ -62,11 +63,13 @@ def positions_view( data, positions_cache):
             st.info("🔄 Background position scanning in progress...")
 
         # Show table below scanning even during scan
-        all_positions = positions_cache.get('data', [])
-        last_scan = positions_cache.get('timestamp', 0)
+        snapshot = snapshot_for(positions_cache)
+        df = snapshot.to_frame(accounts_df=data)
+        last_scan = snapshot.timestamp or positions_cache.get('timestamp', 0)
         time_since_scan = time.time() - last_scan
+        if snapshot.stale:
+            st.warning(f"Showing positions restored from the last run ({int(time_since_scan)} seconds old); reconciling with MT5 in the background.")
 
-        df = pd.DataFrame(all_positions)
         # Select only the desired columns: Login, ID, Symbol, Vol, Price, P/L, Type, Date, Name
         desired_columns = ['Login', 'ID', 'Symbol', 'Vol', 'Price', 'P/L', 'Type', 'Name']
         if not df.empty:
@@ -82,7 +85,7 @@ def positions_view( data, positions_cache):
             st.table(df_display)
             st.info('No open positions found yet.')
         else:
-            st.write(f"Total positions found so far: {len(all_positions)}")
+            st.write(f"Total positions found so far: {len(df)}")
             # Pagination: 10 rows per page
             rows_per_page = 10
             total_rows = len(df_display)
@@ -151,7 +154,7 @@ def positions_view( data, positions_cache):
                             st.error(f"Error scanning positions for login {login}: {e}")
                             continue
 
-                    positions_cache['data'] = all_positions
+                    positions_cache['data'].replace_all(all_positions)
                     positions_cache['timestamp'] = time.time()
                     from backend import save_positions_cache
                     save_positions_cache(positions_cache)  # Persist cache to file
@@ -162,18 +165,20 @@ def positions_view( data, positions_cache):
             st.error(f"Manual scan failed: {e}")
 
     # Get positions from cache
-    all_positions = positions_cache.get('data', [])
-    last_scan = positions_cache.get('timestamp', 0)
+    snapshot = snapshot_for(positions_cache)
+    df = snapshot.to_frame(accounts_df=data)
+    last_scan = snapshot.timestamp or positions_cache.get('timestamp', 0)
     time_since_scan = time.time() - last_scan
+    if snapshot.stale:
+        st.warning(f"Showing positions restored from the last run ({int(time_since_scan)} seconds old); reconciling with MT5 in the background.")
 
     # Debug info
-    st.write(f"Debug: positions_cache scanning={positions_cache.get('scanning', False)}, data length={len(all_positions) if all_positions else 0}, last_scan={last_scan}, time_since_scan={int(time_since_scan)}")
+    st.write(f"Debug: positions_cache scanning={positions_cache.get('scanning', False)}, data length={len(df)}, last_scan={last_scan}, time_since_scan={int(time_since_scan)}")
 
-    if all_positions:
-        st.write(f"Total positions found: {len(all_positions)}")
+    if len(df):
+        st.write(f"Total positions found: {len(df)}")
         st.write(f"Last updated: {int(time_since_scan)} seconds ago")
 
-    df = pd.DataFrame(all_positions)
     # Select only the desired columns: Login, ID, Symbol, Vol, Price, P/L, Type, Date, Name
     desired_columns = ['Login', 'ID', 'Symbol', 'Vol', 'Price', 'P/L', 'Type', 'Date', 'Name']
     available_columns = [col for col in desired_columns if col in df.columns]
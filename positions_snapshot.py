@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+from positions_store import PositionsStore, as_positions_store
+from columnar_store import read_columns, write_columns
+
+__all__ = ['PositionsSnapshot', 'snapshot_for', 'save_snapshot', 'load_snapshot']
+
+
+class PositionsSnapshot:
+    """Immutable, versioned columnar snapshot of open positions.
+
+    One typed NumPy array per field instead of one dict per position:
+    int64 login/ticket/open time, int32 codes into interned symbol and group
+    tables, float64 volume/price/profit and an int8 side (+1 buy, -1 sell).
+    Account metadata (name, email) is not stored per row; it is joined from
+    the accounts table only when a DataFrame is requested.
+
+    Arrays are read-only and attributes cannot be reassigned, so a published
+    snapshot can be shared between threads without locks. `version` increases
+    with every published snapshot and doubles as a cheap cache key;
+    `source_version` records the PositionsStore version it was built from.
+    `stale` marks a snapshot restored from disk that has not been reconciled
+    with MT5 yet.
+    """
+
+    _COLUMNS = ('login', 'ticket', 'symbol_codes', 'group_codes', 'volume', 'price', 'profit', 'side', 'opened')
+
+    def __init__(self, login, ticket, symbol_codes, symbols, group_codes, groups, volume, price, profit, side, opened,
+                 version=0, timestamp=0, source_version=None, stale=False):
+        columns = dict(login=login, ticket=ticket, symbol_codes=symbol_codes, group_codes=group_codes,
+                       volume=volume, price=price, profit=profit, side=side, opened=opened)
+        for name, array in columns.items():
+            array.flags.writeable = False
+            object.__setattr__(self, name, array)
+        object.__setattr__(self, 'symbols', tuple(symbols))
+        object.__setattr__(self, 'groups', tuple(groups))
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'timestamp', timestamp)
+        object.__setattr__(self, 'source_version', source_version)
+        object.__setattr__(self, 'stale', stale)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('PositionsSnapshot is immutable')
+
+    def __reduce__(self):
+        columns = {name: np.array(getattr(self, name)) for name in self._COLUMNS}
+        return (_rebuild_snapshot, (columns, self.symbols, self.groups, self.version, self.timestamp,
+                                    self.source_version, self.stale))
+
+    def replace(self, **changes):
+        """Return a copy with `changes` applied to the scalar attributes
+        (version, timestamp, source_version, stale). Column arrays are shared.
+        """
+        fields = {name: getattr(self, name) for name in self._COLUMNS}
+        fields.update(symbols=self.symbols, groups=self.groups, version=self.version, timestamp=self.timestamp,
+                      source_version=self.source_version, stale=self.stale)
+        fields.update(changes)
+        return PositionsSnapshot(**fields)
+
+    @property
+    def cache_key(self):
+        """Cheap, hashable identity of this snapshot's contents: the published
+        version, else the store version an unpublished snapshot was built
+        from, else None (no stable identity, do not cache on it).
+        """
+        if self.version:
+            return ('positions', self.version)
+        if self.source_version is not None:
+            return ('store', self.source_version)
+        return None
+
+    @classmethod
+    def empty(cls):
+        return cls.from_rows([])
+
+    @classmethod
+    def from_rows(cls, rows, login_groups=None, version=0, timestamp=0, source_version=None):
+        """Build a snapshot from scanner rows ('Login', 'ID', 'Symbol', 'Vol',
+        'Price', 'P/L', 'Type', 'Date'). `login_groups` maps login -> group name.
+        """
+        columns, symbols, _ = PositionsStore(rows).columns()
+        return cls.from_columns(columns, symbols, login_groups, version, timestamp, source_version)
+
+    @classmethod
+    def from_store(cls, store, login_groups=None, version=0, timestamp=0):
+        """Build a snapshot of a PositionsStore; `source_version` is the store
+        version the columns were copied at.
+        """
+        columns, symbols, source_version = store.columns()
+        return cls.from_columns(columns, symbols, login_groups, version, timestamp, source_version)
+
+    @classmethod
+    def from_columns(cls, columns, symbols, login_groups=None, version=0, timestamp=0, source_version=None):
+        """Build a snapshot from `PositionsStore.columns()` output. Symbol codes
+        are renumbered to the sorted symbols in use, and groups are looked up
+        once per login.
+        """
+        login_groups = login_groups or {}
+        used, symbol_codes = np.unique(columns['symbol'], return_inverse=True)
+        symbol_table = [symbols[code] for code in used]
+        order = np.argsort(np.asarray(symbol_table, dtype=object), kind='stable') if symbol_table else np.zeros(0, np.int64)
+        rank = np.empty(len(order), dtype=np.int32)
+        rank[order] = np.arange(len(order), dtype=np.int32)
+        logins, login_codes = np.unique(columns['login'], return_inverse=True)
+        group_codes, group_table = pd.factorize(
+            pd.Series([login_groups.get(str(login)) or '' for login in logins], dtype=object), sort=True)
+        return cls(
+            login=columns['login'],
+            ticket=columns['ticket'],
+            symbol_codes=rank[symbol_codes.reshape(-1)] if len(order) else np.zeros(0, np.int32),
+            symbols=tuple(symbol_table[i] for i in order),
+            group_codes=group_codes.astype(np.int32)[login_codes.reshape(-1)],
+            groups=tuple(group_table),
+            volume=columns['volume'],
+            price=columns['price'],
+            profit=columns['profit'],
+            side=columns['side'],
+            opened=columns['opened'],
+            version=version,
+            timestamp=timestamp,
+            source_version=source_version,
+        )
+
+    def __len__(self):
+        return len(self.ticket)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the column arrays."""
+        return sum(a.nbytes for a in (self.login, self.ticket, self.symbol_codes, self.group_codes,
+                                      self.volume, self.price, self.profit, self.side, self.opened))
+
+    def symbol_column(self):
+        return pd.Categorical.from_codes(self.symbol_codes, categories=list(self.symbols)) if self.symbols else pd.Categorical([])
+
+    def group_column(self):
+        return pd.Categorical.from_codes(self.group_codes, categories=list(self.groups)) if self.groups else pd.Categorical([])
+
+    def to_frame(self, accounts_df=None):
+        """Return the scanner row layout as a DataFrame ('Login', 'ID', 'Symbol',
+        'Vol', 'Price', 'P/L', 'Type', 'Date', 'Group'). When `accounts_df` is
+        given, 'Name' and 'Email' are joined from it by login.
+        """
+        df = pd.DataFrame({
+            'Login': self.login.astype(str),
+            'ID': self.ticket,
+            'Symbol': self.symbol_column(),
+            'Vol': self.volume,
+            'Price': self.price,
+            'P/L': self.profit,
+            'Type': np.where(self.side > 0, 'Buy', 'Sell'),
+            'Date': self.opened,
+            'Group': self.group_column(),
+        })
+        if accounts_df is not None and not accounts_df.empty and 'login' in accounts_df.columns and len(df):
+            accounts = accounts_df.assign(login=accounts_df['login'].astype(str)).drop_duplicates('login').set_index('login')
+            for column, source in (('Name', 'name'), ('Email', 'email')):
+                if source in accounts.columns:
+                    df[column] = df['Login'].map(accounts[source])
+        return df
+
+
+def _rebuild_snapshot(columns, symbols, groups, version, timestamp, source_version, stale=False):
+    return PositionsSnapshot(symbols=symbols, groups=groups, version=version, timestamp=timestamp,
+                             source_version=source_version, stale=stale, **columns)
+
+
+def save_snapshot(snapshot, directory, extra=None):
+    """Write `snapshot` to `directory` (see columnar_store). `extra`
+    (JSON-serialisable) is stored in the manifest.
+    """
+    columns = {name: getattr(snapshot, name) for name in PositionsSnapshot._COLUMNS}
+    return write_columns(directory, columns, kind='positions_snapshot', snapshot_version=snapshot.version,
+                         timestamp=snapshot.timestamp, symbols=list(snapshot.symbols),
+                         groups=list(snapshot.groups), extra=extra or {})
+
+
+def load_snapshot(directory, mmap=True):
+    """Load the snapshot saved in `directory`, memory-mapping its columns.
+
+    Returns (snapshot, extra) with the snapshot marked stale, or (None, {})
+    when nothing usable is stored.
+    """
+    columns, manifest = read_columns(directory, mmap=mmap)
+    if columns is None or manifest.get('kind') != 'positions_snapshot' or set(columns) != set(PositionsSnapshot._COLUMNS):
+        return None, {}
+    snapshot = PositionsSnapshot(symbols=manifest['symbols'], groups=manifest['groups'],
+                                 version=manifest['snapshot_version'], timestamp=manifest['timestamp'],
+                                 stale=True, **columns)
+    return snapshot, manifest.get('extra') or {}
+
+
+def snapshot_for(positions_cache):
+    """Return the columnar snapshot for a positions cache.
+
+    Returns the snapshot last published by the scanner, which is always a
+    complete pass, even while the scanner is updating the store. Only when
+    nothing has been published yet is a snapshot built from the store rows.
+    """
+    if isinstance(positions_cache, PositionsSnapshot):
+        return positions_cache
+    if isinstance(positions_cache, dict):
+        snapshot = positions_cache.get('snapshot')
+        if snapshot is not None:
+            return snapshot
+        store = as_positions_store(positions_cache)
+        if store is None:
+            return PositionsSnapshot.empty()
+        return PositionsSnapshot.from_store(store, positions_cache.get('login_groups'))
+    store = as_positions_store(positions_cache)
+    return PositionsSnapshot.from_store(store) if store is not None else PositionsSnapshot.empty()
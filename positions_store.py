@@ -0,0 +1,297 @@
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+
+__all__ = ['PositionsStore', 'as_positions_store', 'ROW_FIELDS']
+
+# Scanner row fields; listeners receive records as tuples in this order
+ROW_FIELDS = ('Login', 'ID', 'Symbol', 'Vol', 'Price', 'P/L', 'Type', 'Date')
+LOGIN, TICKET, SYMBOL, VOLUME, PRICE, PROFIT, TYPE, DATE = range(len(ROW_FIELDS))
+
+# Typed column per position slot
+COLUMNS = {
+    'login': np.int64,
+    'ticket': np.int64,
+    'symbol': np.int32,
+    'volume': np.float64,
+    'price': np.float64,
+    'profit': np.float64,
+    'side': np.int8,
+    'opened': np.int64,
+}
+INITIAL_CAPACITY = 1024
+
+
+def _int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def is_sell(order_type):
+    """True for MT5 sell types (1) and 'Sell'-like labels."""
+    return order_type == 1 or (isinstance(order_type, str) and order_type.strip().lower().startswith('s'))
+
+
+class PositionsStore:
+    """Open positions held as typed NumPy columns, indexed by login.
+
+    Each position occupies one slot of the COLUMNS arrays (int64 login,
+    ticket and open time, an int32 code into the interned symbol table,
+    float64 volume/price/profit and an int8 side), so a position costs a few
+    dozen bytes instead of a dict. Rows go in and come out in the scanner
+    format ('Login', 'ID', 'Symbol', 'Vol', 'Price', 'P/L', 'Type', 'Date');
+    other fields are not kept, missing numbers read back as 0 and 'Type' as
+    'Buy'/'Sell'. Lookups by login are O(1); by ticket or symbol they are one
+    vectorized pass. A ticket is unique within its login. All methods are
+    thread-safe; `columns()` returns compacted copies for snapshots.
+    """
+
+    def __init__(self, rows=None):
+        self._lock = threading.RLock()
+        self._listeners = []
+        self.version = 0
+        self.updated_at = 0
+        self._reset()
+        if rows:
+            self.replace_all(rows)
+
+    # --- internal helpers (caller holds the lock) ---
+    def _reset(self, capacity=INITIAL_CAPACITY):
+        self._cols = {name: np.zeros(capacity, dtype) for name, dtype in COLUMNS.items()}
+        self._used = np.zeros(capacity, dtype=bool)
+        self._size = 0
+        self._free = []
+        self._by_login = {}
+        self._symbols = []
+        self._symbol_codes = {}
+
+    def _symbol_code(self, symbol):
+        code = self._symbol_codes.get(symbol)
+        if code is None:
+            code = self._symbol_codes[symbol] = len(self._symbols)
+            self._symbols.append(symbol)
+        return code
+
+    def _slot(self):
+        if self._free:
+            return self._free.pop()
+        if self._size == len(self._used):
+            capacity = 2 * len(self._used)
+            for name, array in self._cols.items():
+                grown = np.zeros(capacity, array.dtype)
+                grown[:self._size] = array
+                self._cols[name] = grown
+            used = np.zeros(capacity, dtype=bool)
+            used[:self._size] = self._used
+            self._used = used
+        self._size += 1
+        return self._size - 1
+
+    def _record(self, slot):
+        cols = self._cols
+        return (str(cols['login'][slot]), int(cols['ticket'][slot]), self._symbols[cols['symbol'][slot]],
+                float(cols['volume'][slot]), float(cols['price'][slot]), float(cols['profit'][slot]),
+                'Sell' if cols['side'][slot] < 0 else 'Buy', int(cols['opened'][slot]))
+
+    def _find(self, login, ticket):
+        tickets = self._cols['ticket']
+        for slot in self._by_login.get(login, ()):
+            if tickets[slot] == ticket:
+                return slot
+        return None
+
+    def _insert(self, row):
+        login = str(row.get('Login'))
+        ticket = _int(row.get('ID'), -1)
+        old = None
+        slot = self._find(login, ticket) if ticket >= 0 else None
+        if slot is None:
+            slot = self._slot()
+            self._used[slot] = True
+            self._by_login.setdefault(login, []).append(slot)
+        elif self._listeners:
+            old = self._record(slot)
+        cols = self._cols
+        cols['login'][slot] = _int(login, -1)
+        cols['ticket'][slot] = ticket
+        cols['symbol'][slot] = self._symbol_code(row.get('Symbol') or '')
+        cols['volume'][slot] = _float(row.get('Vol'))
+        cols['price'][slot] = _float(row.get('Price'))
+        cols['profit'][slot] = _float(row.get('P/L'))
+        cols['side'][slot] = -1 if is_sell(row.get('Type')) else 1
+        cols['opened'][slot] = _int(row.get('Date'), 0)
+        if self._listeners:
+            new = self._record(slot)
+            for listener in self._listeners:
+                listener.apply(old, new)
+
+    def _delete(self, login, slot):
+        record = self._record(slot)
+        self._used[slot] = False
+        self._free.append(slot)
+        slots = self._by_login.get(login)
+        if slots is not None:
+            slots.remove(slot)
+            if not slots:
+                del self._by_login[login]
+        for listener in self._listeners:
+            listener.apply(record, None)
+        return record
+
+    def _live(self):
+        return np.flatnonzero(self._used[:self._size])
+
+    def _touch(self):
+        self.version += 1
+        self.updated_at = time.time()
+
+    # --- listeners ---
+    def add_listener(self, listener):
+        """Register `listener` and replay the current records into it."""
+        with self._lock:
+            listener.reset()
+            for slot in self._live():
+                listener.apply(None, self._record(slot))
+            self._listeners.append(listener)
+
+    @contextmanager
+    def locked(self):
+        """Hold the store lock so several reads see the same version."""
+        with self._lock:
+            yield self
+
+    # --- updates ---
+    def upsert(self, row):
+        """Insert or replace a single position row (keyed by login and 'ID')."""
+        with self._lock:
+            self._insert(row)
+            self._touch()
+
+    def remove(self, ticket):
+        """Remove the position with `ticket`. Returns the removed row or None."""
+        ticket = _int(ticket, None)
+        if ticket is None:
+            return None
+        with self._lock:
+            size = self._size
+            slots = np.flatnonzero((self._cols['ticket'][:size] == ticket) & self._used[:size])
+            if not len(slots):
+                return None
+            slot = int(slots[0])
+            record = self._delete(str(self._cols['login'][slot]), slot)
+            self._touch()
+        return dict(zip(ROW_FIELDS, record))
+
+    def replace_login(self, login, rows):
+        """Replace every row of `login` with `rows` (an empty list drops the login)."""
+        login = str(login)
+        with self._lock:
+            for slot in list(self._by_login.get(login, ())):
+                self._delete(login, slot)
+            for row in rows:
+                self._insert(row)
+            self._touch()
+
+    def replace_all(self, rows):
+        """Replace the whole store with `rows`."""
+        with self._lock:
+            self._reset()
+            for listener in self._listeners:
+                listener.reset()
+            for row in rows:
+                self._insert(row)
+            self._touch()
+
+    # --- queries ---
+    def get(self, ticket):
+        ticket = _int(ticket, None)
+        if ticket is None:
+            return None
+        with self._lock:
+            size = self._size
+            slots = np.flatnonzero((self._cols['ticket'][:size] == ticket) & self._used[:size])
+            return dict(zip(ROW_FIELDS, self._record(slots[0]))) if len(slots) else None
+
+    def for_login(self, login):
+        with self._lock:
+            return [dict(zip(ROW_FIELDS, self._record(slot))) for slot in self._by_login.get(str(login), ())]
+
+    def for_symbol(self, symbol):
+        with self._lock:
+            code = self._symbol_codes.get(symbol)
+            if code is None:
+                return []
+            size = self._size
+            slots = np.flatnonzero((self._cols['symbol'][:size] == code) & self._used[:size])
+            return [dict(zip(ROW_FIELDS, self._record(slot))) for slot in slots]
+
+    def logins(self):
+        with self._lock:
+            return list(self._by_login)
+
+    def symbols(self):
+        with self._lock:
+            codes = np.unique(self._cols['symbol'][self._live()])
+            return [self._symbols[code] for code in codes if self._symbols[code]]
+
+    def tickets(self):
+        with self._lock:
+            tickets = self._cols['ticket'][self._live()]
+            return tickets[tickets >= 0].tolist()
+
+    def columns(self):
+        """Return ({column: compacted array copy}, symbol table, version)."""
+        with self._lock:
+            live = self._live()
+            return {name: array[live] for name, array in self._cols.items()}, tuple(self._symbols), self.version
+
+    def rows(self):
+        with self._lock:
+            return [dict(zip(ROW_FIELDS, self._record(slot))) for slot in self._live()]
+
+    def __len__(self):
+        return self._size - len(self._free)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        return iter(self.rows())
+
+    # pickling (and Streamlit argument hashing) only needs the rows
+    def __getstate__(self):
+        return {'rows': self.rows(), 'version': self.version, 'updated_at': self.updated_at}
+
+    def __setstate__(self, state):
+        self.__init__(state.get('rows'))
+        self.version = state.get('version', self.version)
+        self.updated_at = state.get('updated_at', self.updated_at)
+
+
+def as_positions_store(positions_cache):
+    """Return a PositionsStore for a positions cache dict, a store, a published
+    PositionsSnapshot or a legacy list of rows. Returns None when no positions
+    are available. Stores for snapshots and lists are built on each call.
+    """
+    if positions_cache is None:
+        return None
+    if isinstance(positions_cache, PositionsStore):
+        return positions_cache
+    if isinstance(positions_cache, dict):
+        return as_positions_store(positions_cache.get('data'))
+    from positions_snapshot import PositionsSnapshot
+    if isinstance(positions_cache, PositionsSnapshot):
+        return PositionsStore(positions_cache.to_frame().drop(columns=['Group']).to_dict('records'))
+    if isinstance(positions_cache, list):
+        return PositionsStore(positions_cache)
+    return None
@@ -0,0 +1,192 @@
+import math
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+__all__ = ['SparseMatrix', 'display_sparse_matrix']
+
+TOTALS_ROW = 'All Login'
+
+
+class SparseMatrix:
+    """Login x symbol matrix stored in CSR form.
+
+    Only non-empty (login, symbol) cells are kept: `indptr` delimits each
+    login's cells, `indices` holds their symbol positions and `data` their
+    values. Memory therefore scales with open positions rather than
+    logins x symbols. Column totals ('All Login') are kept alongside and
+    `to_frame`/`page` densify only the requested window.
+    """
+
+    def __init__(self, logins, symbols, indptr, indices, data, totals=None):
+        self.logins = pd.Index(logins, dtype=object)
+        self.symbols = pd.Index(symbols, dtype=object)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=np.float64)
+        if totals is None:
+            totals = np.bincount(self.indices, weights=self.data, minlength=len(self.symbols))
+        self._totals = np.asarray(totals, dtype=np.float64)
+
+    # --- construction ---
+    @classmethod
+    def _from_coo(cls, logins, symbols, rows, cols, values, totals=None):
+        order = np.lexsort((cols, rows))
+        rows, cols, values = rows[order], cols[order], values[order]
+        indptr = np.zeros(len(logins) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(logins)), out=indptr[1:])
+        return cls(logins, symbols, indptr, cols, values, totals)
+
+    @classmethod
+    def from_exposure(cls, exposure, value, logins=None, totals=None):
+        """Build from an exposure frame (login, symbol, <value> columns). Rows are
+        `logins` in the given order (every login found in `exposure` when None),
+        columns the symbols held by those logins, sorted. Maintained `totals`
+        (indexed by symbol) are used when no login is filtered out.
+        """
+        if logins is None:
+            logins = sorted(exposure['login'].unique())
+        logins = pd.Index(list(dict.fromkeys(str(login) for login in logins)), dtype=object)
+        rows = logins.get_indexer(exposure['login'])
+        keep = rows >= 0
+        if not keep.all():
+            totals = None
+        symbol_values = exposure['symbol'].to_numpy()[keep]
+        symbols = pd.Index(sorted(set(symbol_values)), dtype=object)
+        cols = symbols.get_indexer(symbol_values)
+        if totals is not None:
+            totals = totals[value].reindex(symbols, fill_value=0.0).to_numpy()
+        values = exposure[value].to_numpy(dtype=np.float64)[keep]
+        return cls._from_coo(logins, symbols, rows[keep], cols, values, totals)
+
+    @classmethod
+    def from_dict(cls, matrix):
+        """Build from {login: {symbol: value}} (logins kept in dict order)."""
+        logins = pd.Index([str(login) for login in matrix], dtype=object)
+        symbols = pd.Index(sorted({symbol for cells in matrix.values() for symbol in cells}), dtype=object)
+        rows, cols, values = [], [], []
+        for row, cells in enumerate(matrix.values()):
+            for symbol, value in cells.items():
+                rows.append(row)
+                cols.append(symbols.get_loc(symbol))
+                values.append(value)
+        return cls._from_coo(logins, symbols, np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64),
+                             np.asarray(values, dtype=np.float64))
+
+    # --- shape ---
+    @property
+    def shape(self):
+        return len(self.logins), len(self.symbols)
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    @property
+    def empty(self):
+        """True when there are no logins or no symbols (as DataFrame.empty)."""
+        return not len(self.logins) or not len(self.symbols)
+
+    def __len__(self):
+        return len(self.logins)
+
+    def num_pages(self, page_size):
+        return max(1, math.ceil(len(self.logins) / page_size))
+
+    # --- aggregates ---
+    def totals(self):
+        """'All Login' totals per symbol."""
+        return pd.Series(self._totals, index=self.symbols, name=TOTALS_ROW)
+
+    def total(self):
+        return float(self._totals.sum())
+
+    def row(self, login):
+        """Dense values of a single login (or the 'All Login' totals)."""
+        if login == TOTALS_ROW:
+            return self.totals()
+        row = self.logins.get_loc(str(login))
+        start, end = self.indptr[row], self.indptr[row + 1]
+        values = np.zeros(len(self.symbols))
+        values[self.indices[start:end]] = self.data[start:end]
+        return pd.Series(values, index=self.symbols, name=str(login))
+
+    # --- slicing ---
+    def _cells(self, rows):
+        """Return (row within `rows`, cell position) for every stored cell of `rows`."""
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        lengths = ends - starts
+        owner = np.repeat(np.arange(len(rows)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return owner, np.repeat(starts, lengths) + offsets
+
+    def select(self, logins=None, symbols=None):
+        """Return a SparseMatrix restricted to `logins` and/or `symbols`."""
+        rows = np.arange(len(self.logins)) if logins is None else self.logins.get_indexer([str(l) for l in logins])
+        rows = rows[rows >= 0]
+        owner, cells = self._cells(rows)
+        cols = self.indices[cells]
+        new_symbols = self.symbols
+        totals = self._totals if logins is None else None
+        if symbols is not None:
+            positions = self.symbols.get_indexer(list(symbols))
+            positions = np.sort(positions[positions >= 0])
+            mapping = np.full(len(self.symbols), -1, dtype=np.int64)
+            mapping[positions] = np.arange(len(positions))
+            cols = mapping[cols]
+            keep = cols >= 0
+            owner, cells, cols = owner[keep], cells[keep], cols[keep]
+            new_symbols = self.symbols[positions]
+            if totals is not None:
+                totals = totals[positions]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(owner, minlength=len(rows)), out=indptr[1:])
+        return SparseMatrix(self.logins[rows], new_symbols, indptr, cols, self.data[cells], totals)
+
+    # --- densify ---
+    def to_frame(self, start=0, stop=None, totals=True):
+        """Densify logins[start:stop] into the login x symbol DataFrame layout,
+        with the 'All Login' totals row (over every login) on top.
+        """
+        rows = np.arange(len(self.logins))[start:stop]
+        if not len(self.symbols):
+            return pd.DataFrame(index=self.logins[rows])
+        owner, cells = self._cells(rows)
+        values = np.zeros((len(rows), len(self.symbols)))
+        values[owner, self.indices[cells]] = self.data[cells]
+        df = pd.DataFrame(values, index=self.logins[rows], columns=self.symbols)
+        if totals:
+            df = pd.concat([self.totals().to_frame().T, df])
+        df.columns = list(df.columns)
+        return df
+
+    def page(self, number, page_size, totals=True):
+        """Densify page `number` (1-based) of `page_size` logins."""
+        start = (max(1, number) - 1) * page_size
+        return self.to_frame(start, start + page_size, totals)
+
+    def to_csv(self, page_size=1000, decimals=2):
+        """CSV of the full matrix, densified one page at a time."""
+        parts = []
+        for number in range(1, self.num_pages(page_size) + 1):
+            frame = self.page(number, page_size, totals=number == 1).round(decimals)
+            parts.append(frame.to_csv(header=number == 1))
+        return ''.join(parts)
+
+
+def display_sparse_matrix(matrix, key, decimals=2, height=500):
+    """Render `matrix` one page of logins at a time. Only the visible page is
+    densified. Returns the displayed DataFrame.
+    """
+    col_size, col_page, col_info = st.columns([1, 1, 2])
+    with col_size:
+        page_size = st.selectbox('Logins per page', [50, 100, 250, 500], index=1, key=f'{key}_page_size')
+    total_pages = matrix.num_pages(page_size)
+    with col_page:
+        page = st.number_input('Page', min_value=1, max_value=total_pages, value=1, key=f'{key}_page')
+    page_df = matrix.page(int(page), page_size).round(decimals)
+    with col_info:
+        st.caption(f"Page {int(page)}/{total_pages} · {len(matrix)} logins × {len(matrix.symbols)} symbols · "
+                   f"{matrix.nnz} non-empty cells")
+    st.dataframe(page_df, width='stretch', height=height)
+    return page_df
@@ -18,7 +18,7 @@ from XAUUSD import get_xauusd_data
 from groupdashboard import groupdashboard_view
 from file_management import file_management_view  # ⭐ NEW IMPORT
 from watch_manager import watch_manager_view      # ⭐ NEW IMPORT
-from backend import get_initial_caches, save_scanning_status, save_positions_cache, load_from_mt5, load_accounts_cache, start_accounts_updater, get_shared_positions_cache, start_positions_scanner
+from backend import get_initial_caches, save_scanning_status, save_positions_cache, load_from_mt5, get_shared_accounts, start_accounts_updater, get_shared_positions_cache, start_positions_scanner
 from dashboard import dashboard_view
 from reports import reports_view
 from positions import positions_view
@@ -151,7 +151,7 @@ def main():
         pass
 
     # Start accounts cache updater (server-side) once per Streamlit session process.
-    # This keeps `cache/accounts_cache.json` refreshed so clients don't hit MT5.
+    # This keeps the `cache/accounts` store refreshed so clients don't hit MT5.
     if 'accounts_updater_started' not in st.session_state or not st.session_state.accounts_updater_started:
         try:
             # default interval 300s (5 minutes)
@@ -270,8 +270,8 @@ def main():
             with st.spinner('Fetching accounts from MT5 and updating backend cache...'):
                 data = load_from_mt5(use_groups)
         else:
-            with st.spinner('Loading accounts from backend cache...'):
-                data = load_accounts_cache()
+            # process-shared, read-only accounts table refreshed by the accounts updater
+            data = get_shared_accounts()
 
         accounts_cache['scanning'] = False
         accounts_cache['timestamp'] = time.time()
@@ -300,10 +300,10 @@ def main():
         else:
             st.sidebar.info("🔄 Background position scanning in progress...")
 
-    # Normalize columns and types
-    if 'login' in data.columns:
+    # Normalize columns and types (without mutating the shared accounts table)
+    if 'login' in data.columns and not pd.api.types.is_string_dtype(data['login']):
         try:
-            data['login'] = data['login'].astype(str)
+            data = data.assign(login=data['login'].astype(str))
         except Exception:
             pass
 